@@ -0,0 +1,33 @@
+"""Add composite index on messages (conversation_id, created_at)
+
+Revision ID: 3c9d5e7f1a2b
+Revises: 8a1ef18d4fbe
+Create Date: 2026-10-18 09:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d5e7f1a2b'
+down_revision: Union[str, None] = '8a1ef18d4fbe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_messages_conversation_id_created_at',
+        'messages',
+        ['conversation_id', 'created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages')
@@ -0,0 +1,33 @@
+"""Add composite index on conversations (user_id, updated_at)
+
+Revision ID: 5e1b8c4d9f36
+Revises: 3c9d5e7f1a2b
+Create Date: 2026-10-18 10:03:17.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1b8c4d9f36'
+down_revision: Union[str, None] = '3c9d5e7f1a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_conversations_user_id_updated_at',
+        'conversations',
+        ['user_id', 'updated_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversations_user_id_updated_at', table_name='conversations')
@@ -0,0 +1,30 @@
+"""Add needs_title flag to conversations for background titling
+
+Revision ID: b7e3f19a4c52
+Revises: 9d4a6f2c8e17
+Create Date: 2026-10-18 16:02:44.581207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f19a4c52'
+down_revision: Union[str, None] = '9d4a6f2c8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing conversations keep their titles; only new ones get a generated title
+    op.add_column('conversations', sa.Column('needs_title', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('conversations', 'needs_title', server_default=sa.true())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversations', 'needs_title')
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+from app.utils.metrics import UPSTREAM_INFLIGHT, UPSTREAM_QUEUE_DEPTH, UPSTREAM_REJECTIONS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamOverloaded(Exception):
+    """An upstream call was shed instead of queued; retry after retry_after seconds"""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(f"{provider} is overloaded ({reason}), retry in {math.ceil(retry_after)}s")
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_from_error(exc: BaseException, default: float) -> Optional[float]:
+    """Seconds to back off if exc is an upstream 429, otherwise None"""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "code", None)
+    if status != 429:
+        return None
+    headers = getattr(response, "headers", None)
+    retry_after = _parse_retry_after(headers.get("retry-after")) if headers is not None else None
+    return retry_after if retry_after is not None else default
+
+
+class _Waiter:
+    """A queued caller; granted is set (under the controller lock) when a slot is handed to it"""
+
+    def __init__(self, key: Optional[str], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.key = key
+        self.granted = False
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+
+    def wake(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Per-provider gate for upstream calls.
+
+    At most max_inflight calls run at once, and at most max_inflight_per_key of
+    them for any one key (e.g. a model), so one model can't take every slot of
+    the provider; up to max_queue more wait, each for at most queue_timeout
+    seconds. Callers beyond that, and waiters that time out, get
+    UpstreamOverloaded immediately instead of piling up. A 429 from the
+    provider pauses admissions until its Retry-After has passed, so one
+    rate-limit response doesn't turn into a burst of retries.
+
+    Waiters are served first come, first served: a released slot is handed
+    directly to the oldest waiter that can use it (skipping only waiters whose
+    key is at its own cap), so newcomers can't overtake the queue and idle
+    waiters are never woken. Threadpool callers block on an event, event-loop
+    callers await a future, and a cancelled waiter gives back any slot it was
+    handed.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_inflight: int,
+        max_queue: int,
+        queue_timeout: float,
+        default_retry_after: float,
+        max_inflight_per_key: Optional[int] = None,
+    ):
+        self.provider = provider
+        self.max_inflight = max_inflight
+        self.max_inflight_per_key = max_inflight_per_key
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.default_retry_after = default_retry_after
+
+        self._inflight = 0
+        self._inflight_by_key: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+        self._paused_until = 0.0
+        self._resume_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._queue_depth = UPSTREAM_QUEUE_DEPTH.labels(provider=provider)
+        self._inflight_gauge = UPSTREAM_INFLIGHT.labels(provider=provider)
+
+    # Caller holds self._lock in the helpers below
+
+    def _has_room(self, key: Optional[str]) -> bool:
+        if self._inflight >= self.max_inflight or time.monotonic() < self._paused_until:
+            return False
+        if key is not None and self.max_inflight_per_key is not None:
+            return self._inflight_by_key.get(key, 0) < self.max_inflight_per_key
+        return True
+
+    def _take(self, key: Optional[str]):
+        self._inflight += 1
+        self._inflight_gauge.set(self._inflight)
+        if key is not None:
+            self._inflight_by_key[key] = self._inflight_by_key.get(key, 0) + 1
+
+    def _give_back(self, key: Optional[str]):
+        self._inflight -= 1
+        self._inflight_gauge.set(self._inflight)
+        if key in self._inflight_by_key:
+            self._inflight_by_key[key] -= 1
+            if not self._inflight_by_key[key]:
+                del self._inflight_by_key[key]
+
+    def _dispatch(self):
+        """Hand free slots to the oldest waiters that can use them"""
+        for waiter in list(self._waiters):
+            if self._inflight >= self.max_inflight or time.monotonic() < self._paused_until:
+                break
+            if not self._has_room(waiter.key):
+                continue
+            self._take(waiter.key)
+            waiter.granted = True
+            self._waiters.remove(waiter)
+            waiter.wake()
+        self._queue_depth.set(len(self._waiters))
+
+    def _reject(self, reason: str) -> UpstreamOverloaded:
+        UPSTREAM_REJECTIONS_TOTAL.labels(provider=self.provider, reason=reason).inc()
+        retry_after = max(self._paused_until - time.monotonic(), 1.0)
+        return UpstreamOverloaded(self.provider, reason, retry_after)
+
+    def _admit_or_enqueue(self, key: Optional[str], loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """Take a slot right away (returns None) or join the wait queue"""
+        if self._has_room(key):
+            self._take(key)
+            return None
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        if self._paused_until - time.monotonic() > self.queue_timeout:
+            # The provider asked us to back off for longer than anyone would wait
+            raise self._reject("rate_limited")
+        waiter = _Waiter(key, loop)
+        self._waiters.append(waiter)
+        self._queue_depth.set(len(self._waiters))
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Leave the queue after a timeout; False if a slot was handed over first"""
+        if waiter.granted:
+            return False
+        self._waiters.remove(waiter)
+        self._queue_depth.set(len(self._waiters))
+        return True
+
+    def acquire(self, key: Optional[str] = None):
+        with self._lock:
+            waiter = self._admit_or_enqueue(key, None)
+        if waiter is None:
+            return
+        waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            if self._abandon(waiter):
+                raise self._reject("timeout")
+
+    async def acquire_async(self, key: Optional[str] = None):
+        with self._lock:
+            waiter = self._admit_or_enqueue(key, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if not self._abandon(waiter):
+                    # Handed a slot just as we were cancelled; pass it on
+                    self._give_back(key)
+                    self._dispatch()
+            raise
+        with self._lock:
+            if self._abandon(waiter):
+                raise self._reject("timeout")
+
+    def release(self, key: Optional[str] = None):
+        with self._lock:
+            self._give_back(key)
+            self._dispatch()
+
+    def _resume(self):
+        with self._lock:
+            self._resume_timer = None
+            self._dispatch()
+
+    def observe_error(self, exc: BaseException):
+        """Pause admissions if exc is the provider rate-limiting us"""
+        retry_after = retry_after_from_error(exc, self.default_retry_after)
+        if retry_after is None:
+            return
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            # Releases during the pause hand nothing out, so wake the queue when it ends
+            if self._resume_timer is not None:
+                self._resume_timer.cancel()
+            self._resume_timer = threading.Timer(self._paused_until - time.monotonic(), self._resume)
+            self._resume_timer.daemon = True
+            self._resume_timer.start()
+        logger.warning("%s rate limited; pausing admissions for %.1fs", self.provider, retry_after)
+
+    @contextmanager
+    def slot(self, key: Optional[str] = None):
+        self.acquire(key)
+        try:
+            yield
+        except Exception as exc:
+            self.observe_error(exc)
+            raise
+        finally:
+            self.release(key)
+
+    @asynccontextmanager
+    async def aslot(self, key: Optional[str] = None):
+        await self.acquire_async(key)
+        try:
+            yield
+        except Exception as exc:
+            self.observe_error(exc)
+            raise
+        finally:
+            self.release(key)
+
+
+# One controller per upstream provider
+gemini_admission = AdmissionController(
+    "gemini",
+    max_inflight=settings.llm_max_inflight,
+    max_queue=settings.llm_max_queue,
+    queue_timeout=settings.llm_queue_timeout_seconds,
+    default_retry_after=settings.upstream_default_retry_after_seconds,
+    max_inflight_per_key=settings.llm_max_inflight_per_model,
+)
+pollinations_admission = AdmissionController(
+    "pollinations",
+    max_inflight=settings.image_max_concurrency,
+    max_queue=settings.image_max_queue,
+    queue_timeout=settings.image_queue_timeout_seconds,
+    default_retry_after=settings.upstream_default_retry_after_seconds,
+)
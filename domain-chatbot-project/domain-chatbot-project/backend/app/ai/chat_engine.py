@@ -1,37 +1,47 @@
 from typing import List, Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import BaseMessage, HumanMessage, SystemMessage, AIMessage
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
-import os
-import google.generativeai as genai
-import asyncio
+from app.ai.response_cache import response_cache
+from app.ai.admission import UpstreamOverloaded
+from app.ai.llm_registry import llm_registry
+from app.ai.single_flight import stream_flights
+from app.utils.metrics import STREAM_TOKENS_PER_SECOND, STREAM_TTFT_SECONDS
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 class DomainChatEngine:
     def __init__(self):
-        # Configure Google Gemini API
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-preview-05-20",
-            temperature=0.7,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            convert_system_message_to_human=True
-        )
+        self._llm = None
         
-        # Domain-specific conversation chains
-        self.domain_chains = {}
-        self._initialize_domain_chains()
+        # Domain-specific prompts; history comes in as the assembled context
+        self.domain_prompts = {}
+        # Size of the slices cached answers are replayed in
+        self.replay_chunk_size = 64
+        self._initialize_domain_prompts()
     
-    def _initialize_domain_chains(self):
-        """Initialize conversation chains for each domain"""
+    @property
+    def llm(self):
+        """Shared Gemini client from the LLM registry, created on first use"""
+        if self._llm is None:
+            self._llm = llm_registry.get(temperature=0.7)
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        # Lets benchmarks and tests swap in a stub model
+        self._llm = value
+
+    def _initialize_domain_prompts(self):
+        """Initialize prompt templates for each domain"""
         
-        # Modified templates for Gemini (no separate system role)
+        # Modified templates for Gemini (no separate system role); {history} is the
+        # assembled context, which carries its own section headings
         domain_templates = {
             "stock": """You are a professional financial advisor. 
             
-            Previous conversation:
             {history}
             
             Human: {input}
@@ -42,7 +52,6 @@ class DomainChatEngine:
             
             "law": """You are a legal information assistant.
             
-            Previous conversation:
             {history}
             
             Human: {input}
@@ -53,7 +62,6 @@ class DomainChatEngine:
             
             "entertainment": """You are an entertainment expert.
             
-            Previous conversation:
             {history}
             
             Human: {input}
@@ -64,7 +72,6 @@ class DomainChatEngine:
             
             "psychology": """You are a psychology educator.
             
-            Previous conversation:
             {history}
             
             Human: {input}
@@ -75,7 +82,6 @@ class DomainChatEngine:
             
             "technical": """You are a senior software engineer.
             
-            Previous conversation:
             {history}
             
             Human: {input}
@@ -86,74 +92,91 @@ class DomainChatEngine:
         }
         
         for domain, template in domain_templates.items():
-            prompt = PromptTemplate(
+            self.domain_prompts[domain] = PromptTemplate(
                 input_variables=["history", "input"],
                 template=template
             )
-            
-            memory = ConversationBufferWindowMemory(
-                k=10,  # Remember last 10 exchanges
-                return_messages=False  # Return as string for Gemini compatibility
-            )
-            
-            self.domain_chains[domain] = ConversationChain(
-                llm=self.llm,
-                prompt=prompt,
-                memory=memory,
-                verbose=False
-            )
-    
-    def get_response(self, domain: str, user_input: str, conversation_id: str) -> str:
-        """Get domain-specific response using LangChain conversation chain with Gemini"""
-        
-        if domain not in self.domain_chains:
-            return f"Sorry, I don't have expertise in the {domain} domain yet."
-        
-        try:
-            # Get the domain-specific chain
-            chain = self.domain_chains[domain]
-            
-            # Generate response
-            response = chain.predict(input=user_input)
-            
-            return response
-            
-        except Exception as e:
-            print(f"Chat engine error: {e}")
-            return "I'm having trouble processing your request. Please try again."
     
     async def stream_response(
         self,
         domain: str,
         user_input: str,
         conversation_id: str,
-        max_tokens: int = 300,
-        context: str = None
+        context: str = None,
+        length: str = "medium"
     ):
         """
-        Stream response from Gemini (if supported), otherwise fake streaming by chunking.
+        Stream response tokens from Gemini as they arrive.
+
+        Uses the LLM's async streaming interface so the event loop is never
+        blocked, and records time-to-first-token for every request. The
+        assembled context (see ContextAssembler) is the prompt's history.
         """
-        if domain not in self.domain_chains:
+        if domain not in self.domain_prompts:
             yield f"Sorry, I don't have expertise in the {domain} domain yet."
             return
 
+        started_at = time.perf_counter()
+        first_token_at = None
+        response_parts = []
+
         try:
-            chain = self.domain_chains[domain]
-            # If your LLM supports streaming, use it here.
-            # For now, we'll fake streaming by splitting the response.
-            response = chain.predict(input=user_input)
-            # Split response into chunks (e.g., by sentence or every N chars)
-            chunk_size = 30
-            for i in range(0, len(response), chunk_size):
-                yield response[i:i+chunk_size]
-                await asyncio.sleep(0.05)  # Simulate streaming delay
+            history = context or ""
+            prompt_text = self.domain_prompts[domain].format(history=history, input=user_input)
+
+            use_cache = response_cache.is_enabled_for(domain)
+            cache_key = response_cache.make_key(domain, user_input, length, history)
+            cached_response = response_cache.get(cache_key) if use_cache else None
+            if cached_response is not None:
+                # Replay the cached answer as a stream without calling the LLM
+                for i in range(0, len(cached_response), self.replay_chunk_size):
+                    yield cached_response[i:i + self.replay_chunk_size]
+                return
+
+            # Identical prompts already streaming share that upstream stream
+            async for text in stream_flights.stream(cache_key, lambda: self._astream_text(prompt_text)):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    self._record_ttft(conversation_id, domain, first_token_at - started_at)
+                response_parts.append(text)
+                yield text
+
+            full_response = "".join(response_parts)
+            if first_token_at is not None:
+                self._record_throughput(domain, full_response, time.perf_counter() - first_token_at)
+            if use_cache:
+                response_cache.set(cache_key, full_response)
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             yield f"\n[Error]: {str(e)}"
-    
-    def clear_conversation_memory(self, domain: str):
-        """Clear conversation memory for a specific domain"""
-        if domain in self.domain_chains:
-            self.domain_chains[domain].memory.clear()
 
-# Create singleton instance
-chat_engine = DomainChatEngine()
\ No newline at end of file
+    async def _astream_text(self, prompt_text: str):
+        """Non-empty text chunks of one upstream stream"""
+        async for chunk in self.llm.astream(prompt_text):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                yield text
+
+    def _record_ttft(self, conversation_id: str, domain: str, ttft: float):
+        """Record time-to-first-token for a streamed request"""
+        STREAM_TTFT_SECONDS.labels(domain=domain).observe(ttft)
+        logger.debug("Stream TTFT conversation=%s domain=%s: %.0f ms", conversation_id, domain, ttft * 1000)
+
+    @staticmethod
+    def _record_throughput(domain: str, response: str, generation_seconds: float):
+        """Record output tokens per second after the first token (~4 chars per token)"""
+        if generation_seconds > 0:
+            STREAM_TOKENS_PER_SECOND.labels(domain=domain).observe(len(response) / 4 / generation_seconds)
+
+_chat_engine = None
+_chat_engine_lock = threading.Lock()
+
+def get_chat_engine() -> DomainChatEngine:
+    """Return the shared DomainChatEngine, building it on first use"""
+    global _chat_engine
+    if _chat_engine is None:
+        with _chat_engine_lock:
+            if _chat_engine is None:
+                _chat_engine = DomainChatEngine()
+    return _chat_engine
@@ -0,0 +1,152 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.metrics import CONTEXT_TOKENS_SAVED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Prompt-token budget for conversation context, per response length
+CONTEXT_TOKEN_BUDGETS = {"short": 500, "medium": 1000, "long": 2000}
+# Domains whose answers lean more on earlier turns get a larger share
+DOMAIN_BUDGET_WEIGHTS = {
+    "technical": 1.5,
+    "law": 1.25,
+    "stock": 1.0,
+    "psychology": 1.0,
+    "entertainment": 0.75,
+}
+# A turn cut shorter than this carries too little to be worth including
+MIN_TRUNCATED_TURN_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+@dataclass(frozen=True)
+class AssembledContext:
+    """Prompt context packed within a token budget"""
+    text: str
+    tokens: int
+    budget: int
+    included_turns: int
+    dropped_turns: int
+    # Tokens the same history and extra content would cost if sent in full
+    full_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.full_tokens - self.tokens, 0)
+
+
+class ContextAssembler:
+    """
+    Builds the single conversation context every AI path uses.
+
+    Turns are packed newest first until the budget for the domain and length
+    mode runs out; the turn that no longer fits whole is truncated if enough
+    room is left, and everything older is dropped. The current user message
+    and consecutive duplicates are left out, since the prompt adds the
+    message itself. A rolling summary of older messages, when there is one,
+    goes first and stands in for the turns it covers.
+    """
+
+    def __init__(self, budget_scale: float, history_limit: int):
+        self.budget_scale = budget_scale
+        # How many stored messages callers should load for assembly
+        self.history_limit = history_limit
+
+    def budget_for(self, domain: str, length: str) -> int:
+        base = CONTEXT_TOKEN_BUDGETS.get(length, CONTEXT_TOKEN_BUDGETS["medium"])
+        return int(base * DOMAIN_BUDGET_WEIGHTS.get(domain, 1.0) * self.budget_scale)
+
+    @staticmethod
+    def _turns(history: Sequence, current_message: Optional[str]) -> List[Tuple[str, str]]:
+        """(role, content) pairs from ORM messages or dicts, oldest first"""
+        turns = []
+        for msg in history:
+            role = msg["role"] if isinstance(msg, dict) else msg.role
+            content = (msg["content"] if isinstance(msg, dict) else msg.content) or ""
+            if role not in ("user", "assistant") or not content.strip():
+                continue
+            if turns and turns[-1] == (role, content):
+                continue
+            turns.append((role, content))
+        # The chat routes store the user message before loading history
+        if current_message is not None and turns and turns[-1] == ("user", current_message):
+            turns.pop()
+        return turns
+
+    @staticmethod
+    def _render_turn(role: str, content: str) -> str:
+        return f"{'Human' if role == 'user' else 'Assistant'}: {content}"
+
+    def assemble(
+        self,
+        domain: str,
+        length: str,
+        history: Sequence,
+        current_message: Optional[str] = None,
+        extra: str = "",
+        summary: str = "",
+    ) -> AssembledContext:
+        budget = self.budget_for(domain, length)
+        turns = self._turns(history, current_message)
+        full_tokens = sum(estimate_tokens(self._render_turn(*turn)) for turn in turns) + estimate_tokens(extra)
+
+        sections = []
+        remaining = budget
+        if summary:
+            # The summary replaces every older turn; give it up to a quarter of the budget
+            summary = f"Summary of the earlier conversation:\n{summary[:max(budget // 4, 0) * 4]}"
+            sections.append(summary)
+            remaining -= estimate_tokens(summary)
+            full_tokens += estimate_tokens(summary)
+        if extra:
+            # Content the user pointed us at (e.g. a fetched article) may use up to half the budget
+            extra = extra[:max(budget // 2, 0) * 4]
+            sections.append(extra)
+            remaining -= estimate_tokens(extra)
+
+        packed: List[str] = []
+        for role, content in reversed(turns):
+            line = self._render_turn(role, content)
+            cost = estimate_tokens(line)
+            if cost <= remaining:
+                packed.append(line)
+                remaining -= cost
+                continue
+            if remaining >= MIN_TRUNCATED_TURN_TOKENS:
+                packed.append(line[:remaining * 4 - 3] + "...")
+            break
+
+        if packed:
+            sections.append("Previous conversation:\n" + "\n".join(reversed(packed)))
+        text = "\n\n".join(sections) if sections else "This is the start of a new conversation."
+
+        assembled = AssembledContext(
+            text=text,
+            tokens=estimate_tokens(text),
+            budget=budget,
+            included_turns=len(packed),
+            dropped_turns=len(turns) - len(packed),
+            full_tokens=full_tokens,
+        )
+        if assembled.tokens_saved:
+            CONTEXT_TOKENS_SAVED_TOTAL.labels(domain=domain).inc(assembled.tokens_saved)
+        logger.debug(
+            "Context for %s/%s: %d/%d tokens, %d turns kept, %d dropped, %d tokens saved",
+            domain, length, assembled.tokens, budget,
+            assembled.included_turns, assembled.dropped_turns, assembled.tokens_saved,
+        )
+        return assembled
+
+
+# Create singleton instance
+context_assembler = ContextAssembler(
+    budget_scale=settings.context_token_budget_scale,
+    history_limit=settings.context_history_limit,
+)
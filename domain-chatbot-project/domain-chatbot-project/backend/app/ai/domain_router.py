@@ -1,11 +1,17 @@
-from typing import Dict, List, Any, TypedDict
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
+from typing import Dict, Optional, TypedDict
+from langchain.schema import HumanMessage
 from langgraph.graph import Graph, END
-import os
+import logging
+import threading
+import time
 from enum import Enum
+from app.ai.response_cache import response_cache
+from app.ai.admission import UpstreamOverloaded
+from app.ai.llm_registry import llm_registry
+from app.ai.single_flight import router_flights
+from app.utils.metrics import FALLBACK_RESPONSES_TOTAL, ROUTER_STAGE_SECONDS
 
-import google.generativeai as genai
+logger = logging.getLogger(__name__)
 
 class DomainType(str, Enum):
     STOCK = "stock"
@@ -14,25 +20,31 @@ class DomainType(str, Enum):
     PSYCHOLOGY = "psychology"
     TECHNICAL = "technical"
 
+class PipelineMode(str, Enum):
+    SINGLE_PASS = "single_pass"            # generate only
+    ANALYZE_GENERATE = "analyze_generate"  # analyze -> generate
+    FULL = "full"                          # analyze -> generate -> enhance
+
+# Nodes each pipeline mode runs, in order
+PIPELINE_STAGES = {
+    PipelineMode.SINGLE_PASS: ["generate_response"],
+    PipelineMode.ANALYZE_GENERATE: ["analyze_query", "generate_response"],
+    PipelineMode.FULL: ["analyze_query", "generate_response", "enhance_response"],
+}
+
 class ConversationState(TypedDict):
-    messages: List[BaseMessage]
     domain: str
     system_prompt: str
     user_query: str
     context: str
     response: str
     analysis: str
+    timings: Dict[str, float]
 
 
 class DomainRouter:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-preview-05-20",
-            temperature=0.7,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            convert_system_message_to_human=True
-        )
+        self._llm = None
         self.domain_prompts = {
             DomainType.STOCK: (
                 "You are a professional financial advisor and stock market analyst. "
@@ -87,9 +99,52 @@ class DomainRouter:
                 "Provide practical, working solutions with clear explanations."
             )
         }
-        self.workflow = self._build_workflow()
+        # Default pipeline per domain; can be overridden per request
+        self.domain_pipeline_modes = {
+            DomainType.STOCK: PipelineMode.FULL,
+            DomainType.LAW: PipelineMode.FULL,
+            DomainType.ENTERTAINMENT: PipelineMode.SINGLE_PASS,
+            DomainType.PSYCHOLOGY: PipelineMode.ANALYZE_GENERATE,
+            DomainType.TECHNICAL: PipelineMode.ANALYZE_GENERATE,
+        }
+        # Compile each pipeline graph once
+        self.workflows = {mode: self._build_workflow(mode) for mode in PipelineMode}
+
+    @property
+    def llm(self):
+        """Shared Gemini client from the LLM registry, created on first use"""
+        if self._llm is None:
+            self._llm = llm_registry.get(temperature=0.7)
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        # Lets benchmarks and tests swap in a stub model
+        self._llm = value
+
+    def resolve_pipeline_mode(self, domain: str, mode: Optional[str] = None) -> PipelineMode:
+        """Pick the per-request mode if valid, otherwise the domain default"""
+        if mode:
+            try:
+                return PipelineMode(mode)
+            except ValueError:
+                logger.warning("Unknown pipeline mode '%s', using domain default", mode)
+        return self.domain_pipeline_modes.get(domain, PipelineMode.FULL)
+
+    def _build_workflow(self, mode: PipelineMode = PipelineMode.FULL) -> Graph:
+        def timed(name, node):
+            """Wrap a node so its wall time is recorded in state['timings'] and the stage histogram"""
+            histogram = ROUTER_STAGE_SECONDS.labels(stage=name, mode=mode.value)
+
+            def run(state: ConversationState) -> ConversationState:
+                started_at = time.perf_counter()
+                state = node(state)
+                elapsed = time.perf_counter() - started_at
+                state['timings'][name] = elapsed
+                histogram.observe(elapsed)
+                return state
+            return run
 
-    def _build_workflow(self) -> Graph:
         def analyze_query(state: ConversationState) -> ConversationState:
             analysis_prompt = (
                 f"You are an expert query analyzer. Analyze this user query in the context of {state['domain']} domain:\n\n"
@@ -104,12 +159,11 @@ class DomainRouter:
 
         def generate_domain_response(state: ConversationState) -> ConversationState:
             conversation_context = f"{state['system_prompt']}\n\n"
-            if state['messages']:
-                conversation_context += "Previous conversation:\n"
-                for msg in state['messages'][-6:]:
-                    role = "Human" if isinstance(msg, HumanMessage) else "Assistant"
-                    conversation_context += f"{role}: {msg.content}\n"
-                conversation_context += "\n"
+            if state.get('analysis'):
+                conversation_context += f"Query analysis (use this to focus your answer):\n{state['analysis']}\n\n"
+            if state['context']:
+                # Already holds the budgeted conversation history from the context assembler
+                conversation_context += f"{state['context']}\n\n"
             conversation_context += f"Human: {state['user_query']}\n\nAssistant:"
             messages = [HumanMessage(content=conversation_context)]
             response = self.llm.invoke(messages)
@@ -135,41 +189,90 @@ class DomainRouter:
                 state['response'] = enhanced_response.content
             return state
 
+        nodes = {
+            "analyze_query": analyze_query,
+            "generate_response": generate_domain_response,
+            "enhance_response": enhance_response,
+        }
+        stages = PIPELINE_STAGES[mode]
+
         workflow = Graph()
-        workflow.add_node("analyze_query", analyze_query)
-        workflow.add_node("generate_response", generate_domain_response)
-        workflow.add_node("enhance_response", enhance_response)
-        workflow.add_edge("analyze_query", "generate_response")
-        workflow.add_edge("generate_response", "enhance_response")
-        workflow.add_edge("enhance_response", END)
-        workflow.set_entry_point("analyze_query")
+        for stage in stages:
+            workflow.add_node(stage, timed(stage, nodes[stage]))
+        for current_stage, next_stage in zip(stages, stages[1:]):
+            workflow.add_edge(current_stage, next_stage)
+        workflow.add_edge(stages[-1], END)
+        workflow.set_entry_point(stages[0])
         return workflow.compile()
 
-    def generate_response(self, domain: str, user_query: str, conversation_history: List[Dict], context: str = "") -> str:
+    def generate_response(
+        self,
+        domain: str,
+        user_query: str,
+        context: str = "",
+        mode: Optional[str] = None,
+        length: str = "medium"
+    ) -> str:
+        # The context carries the conversation history the prompt sees, so it keys the cache too
+        use_cache = response_cache.is_enabled_for(domain)
+        cache_key = response_cache.make_key(domain, user_query, length, context)
+        if use_cache:
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+        # Identical requests already running share that pipeline run instead of starting their own
+        pipeline_mode = self.resolve_pipeline_mode(domain, mode)
+        return router_flights.do(
+            f"{pipeline_mode.value}:{cache_key}",
+            lambda: self._run_pipeline(domain, user_query, context, pipeline_mode, cache_key if use_cache else None),
+        )
+
+    def _run_pipeline(
+        self,
+        domain: str,
+        user_query: str,
+        context: str,
+        pipeline_mode: PipelineMode,
+        cache_key: Optional[str]
+    ) -> str:
         try:
-            messages = []
-            for msg in conversation_history:
-                if msg['role'] == 'user':
-                    messages.append(HumanMessage(content=msg['content']))
-                elif msg['role'] == 'assistant':
-                    messages.append(AIMessage(content=msg['content']))
             initial_state: ConversationState = {
-                'messages': messages,
                 'domain': domain,
                 'system_prompt': self.domain_prompts.get(domain, "You are a helpful assistant."),
                 'user_query': user_query,
                 'context': context,
-                'response': ''
+                'response': '',
+                'analysis': '',
+                'timings': {}
             }
-            result = self.workflow.invoke(initial_state)
+            result = self.workflows[pipeline_mode].invoke(initial_state)
+            if logger.isEnabledFor(logging.DEBUG):
+                timings = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in result['timings'].items())
+                logger.debug("DomainRouter %s pipeline for %s: %s", pipeline_mode.value, domain, timings)
+            if cache_key is not None:
+                response_cache.set(cache_key, result['response'])
             return result['response']
+        except UpstreamOverloaded:
+            # Shed load: let the caller answer 503 rather than a canned reply
+            raise
         except Exception as e:
             fallback_response = (
                 f"I understand you're asking about '{user_query}' in the {domain} domain. "
                 "I'm having trouble processing your request right now, but I'd be happy to help. "
                 "Could you please rephrase your question?"
             )
-            print(f"LangGraph error: {e}")
+            logger.exception("LangGraph error: %s", e)
+            FALLBACK_RESPONSES_TOTAL.labels(domain=domain, source="domain_router").inc()
             return fallback_response
 
-domain_router = DomainRouter()
\ No newline at end of file
+_domain_router = None
+_domain_router_lock = threading.Lock()
+
+def get_domain_router() -> DomainRouter:
+    """Return the shared DomainRouter, compiling its graphs on first use"""
+    global _domain_router
+    if _domain_router is None:
+        with _domain_router_lock:
+            if _domain_router is None:
+                _domain_router = DomainRouter()
+    return _domain_router
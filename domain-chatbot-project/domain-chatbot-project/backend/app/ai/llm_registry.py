@@ -0,0 +1,96 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+from app.ai.admission import AdmissionController, gemini_admission
+from app.config import settings
+
+DEFAULT_MODEL = "gemini-2.5-flash-preview-05-20"
+
+
+class BoundedChatModel:
+    """Chat model proxy that runs every call through the provider's admission controller, keyed by model"""
+
+    def __init__(self, llm, admission: AdmissionController, model: str):
+        self._llm = llm
+        self._admission = admission
+        self._model = model
+
+    def invoke(self, *args, **kwargs):
+        with self._admission.slot(self._model):
+            return self._llm.invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        async with self._admission.aslot(self._model):
+            return await self._llm.ainvoke(*args, **kwargs)
+
+    async def astream(self, *args, **kwargs):
+        async with self._admission.aslot(self._model):
+            async for chunk in self._llm.astream(*args, **kwargs):
+                yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+
+class LLMRegistry:
+    """
+    One place that creates Gemini chat clients.
+
+    Clients are created lazily per (model, temperature, options). Variants of
+    the same model are copies of one base client, so they share its transport
+    and connection pool, and every client goes through the same Gemini
+    admission controller, which also caps concurrent calls per model.
+    """
+
+    def __init__(self, admission: AdmissionController, max_retries: int):
+        self.admission = admission
+        self.max_retries = max_retries
+        self._clients: Dict[Tuple, BoundedChatModel] = {}
+        self._base_clients: Dict[str, object] = {}
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        if not self._configured:
+            import google.generativeai as genai
+            genai.configure(api_key=self._api_key())
+            self._configured = True
+
+    @staticmethod
+    def _api_key():
+        return settings.google_api_key or os.getenv("GOOGLE_API_KEY")
+
+    def get(self, model: str = DEFAULT_MODEL, temperature: float = 0.7, **options) -> BoundedChatModel:
+        key = (model, temperature, tuple(sorted(options.items())))
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+            self._configure()
+
+            base = self._base_clients.get(model)
+            if base is None:
+                # Built without any caller's options, so they can't leak into other variants
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                base = ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=self._api_key(),
+                    convert_system_message_to_human=True,
+                    max_retries=self.max_retries,
+                )
+                self._base_clients[model] = base
+            # Shallow copy keeps the base client's underlying API client (and its connections)
+            llm = base.model_copy(update={"temperature": temperature, **options})
+
+            client = BoundedChatModel(llm, self.admission, model)
+            self._clients[key] = client
+            return client
+
+
+# Create singleton instance
+llm_registry = LLMRegistry(admission=gemini_admission, max_retries=settings.llm_max_retries)
@@ -0,0 +1,86 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.config import settings
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class ResponseCache:
+    """
+    In-process LRU + TTL cache of AI answers.
+
+    Keys are (domain, normalized query, length mode, context hash). Domains
+    listed in RESPONSE_CACHE_DISABLED_DOMAINS are never cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disabled_domains: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disabled_domains = {d.strip().lower() for d in disabled_domains.split(",") if d.strip()}
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        # Shared by sync threadpool routes and the event loop
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+    def make_key(self, domain: str, query: str, length: str = "medium", context: str = "") -> CacheKey:
+        context_hash = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+        return (domain.lower(), self.normalize_query(query), length, context_hash)
+
+    def is_enabled_for(self, domain: str) -> bool:
+        return self.max_entries > 0 and domain.lower() not in self.disabled_domains
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: CacheKey, response: str):
+        if not response or not response.strip():
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "disabled_domains": sorted(self.disabled_domains),
+            }
+
+
+# Create singleton instance
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    disabled_domains=settings.response_cache_disabled_domains,
+)
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional, TypeVar
+
+from app.utils.metrics import SINGLE_FLIGHT_COALESCING_RATIO, SINGLE_FLIGHT_REQUESTS_TOTAL
+
+T = TypeVar("T")
+
+
+class _FlightStats:
+    """Leader/follower counts for one kind of coalesced call"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.leaders = 0
+        self.followers = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, role: str):
+        with self._stats_lock:
+            if role == "leader":
+                self.leaders += 1
+            else:
+                self.followers += 1
+            ratio = self.followers / (self.leaders + self.followers)
+        SINGLE_FLIGHT_REQUESTS_TOTAL.labels(kind=self.kind, role=role).inc()
+        SINGLE_FLIGHT_COALESCING_RATIO.labels(kind=self.kind).set(ratio)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.leaders + self.followers
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "coalescing_ratio": round(self.followers / total, 4) if total else 0.0,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(_FlightStats):
+    """
+    Coalesces identical concurrent blocking calls.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for it and get the same result (or exception). Nothing is kept
+    once the call finishes, so this never serves stale answers; that's the
+    response cache's job.
+    """
+
+    def __init__(self, kind: str):
+        super().__init__(kind)
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count("leader" if leader else "follower")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _SharedStream:
+    """Chunks of one upstream stream, replayable by any number of subscribers"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.finished = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class StreamSingleFlight(_FlightStats):
+    """
+    Coalesces identical concurrent token streams on the event loop.
+
+    The upstream stream for a key runs in its own task and every subscriber,
+    including the one that started it, reads the same chunks from the start.
+    A subscriber disconnecting doesn't cancel the stream for the others, but
+    once the last one is gone the upstream stream is cancelled and closed.
+    """
+
+    def __init__(self, kind: str):
+        super().__init__(kind)
+        self._streams: Dict[str, _SharedStream] = {}
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.create_task(self._pump(key, shared, factory()))
+            self._count("leader")
+        else:
+            self._count("follower")
+
+        shared.subscribers += 1
+        try:
+            async for chunk in shared.subscribe():
+                yield chunk
+        finally:
+            shared.subscribers -= 1
+            if not shared.subscribers and not shared.finished:
+                # Nobody is left to read it; stop paying for the upstream call
+                shared.task.cancel()
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+
+    async def _pump(self, key: str, shared: _SharedStream, chunks: AsyncIterator[str]):
+        try:
+            async for chunk in chunks:
+                shared.publish(chunk)
+        except BaseException as e:
+            shared.finish(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            shared.finish()
+        finally:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+
+# Create singleton instances
+router_flights = SingleFlight("router")
+stream_flights = StreamSingleFlight("stream")
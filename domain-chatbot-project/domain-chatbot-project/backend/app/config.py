@@ -9,14 +9,74 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Resolved-principal cache used by get_current_user
+    principal_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: float = 60.0
+    # Put profile claims in tokens and trust them instead of loading the user
+    auth_claims_only: bool = False
+    # bcrypt cost and the size of the dedicated hashing pool
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 4
     runwayml_api_key: str | None = None
     huggingface_api_key: str | None = None
     # Google Gemini API
     google_api_key: str | None = None
     google_application_credentials: str | None = None
+    # Gemini admission control: concurrent calls, callers allowed to wait, and how long they wait
+    llm_max_inflight: int = 16
+    llm_max_inflight_per_model: int = 16  # share of those slots any one Gemini model may hold
+    llm_max_queue: int = 64
+    llm_queue_timeout_seconds: float = 10.0
+    llm_max_retries: int = 1  # client-side retries; 429s are handled by admission control
+    upstream_default_retry_after_seconds: float = 5.0  # back-off for a 429 without Retry-After
     app_name: str = "Domain Chatbot"
     debug: bool = True
+    # Startup behaviour
+    auto_create_tables: bool = True  # create missing tables on startup (use Alembic in production)
+    ai_warmup_on_startup: bool = False  # build the AI stack at startup instead of on first request
     next_public_api_url: str  # Add this line
+    # Public URL of this API, used to build links to generated images
+    public_base_url: str = "http://localhost:8000"
+
+    # Image generation (Pollinations)
+    image_max_concurrency: int = 4
+    image_max_queue: int = 32
+    image_queue_timeout_seconds: float = 15.0
+    image_timeout_seconds: float = 30.0
+    image_job_mode: bool = False  # stream a placeholder URL instead of waiting for the image
+    image_passthrough_mode: bool = False  # stream a URL that proxies the image bytes as they arrive
+    image_max_bytes: int = 10 * 1024 * 1024  # hard cap on a single downloaded image
+    image_download_chunk_bytes: int = 64 * 1024
+    image_cache_max_bytes: int = 500 * 1024 * 1024  # disk budget for stored images, LRU-evicted; 0 = unbounded
+    image_cache_rescan_seconds: float = 60.0  # how often each worker recounts the image directory shared with the others
+    image_store_state_dir: str = "image_store"  # prompts and partial downloads, kept off the static mount (same filesystem)
+
+    # AI response cache
+    response_cache_max_entries: int = 2048  # 0 disables the cache
+    response_cache_ttl_seconds: float = 3600.0
+    response_cache_disabled_domains: str = "stock"  # comma-separated; stock answers age quickly
+
+    # Conversation context packed into prompts
+    context_token_budget_scale: float = 1.0  # multiplies the per-domain/length token budgets
+    context_history_limit: int = 20  # stored messages loaded for context assembly
+    # Rolling conversation summaries
+    summary_every_messages: int = 10  # fold older messages in once this many are pending; 0 disables
+    summary_keep_recent_messages: int = 6  # newest messages always sent verbatim
+
+    # Write-behind queue for assistant messages
+    message_write_queue_size: int = 1000
+    message_write_batch_size: int = 50
+    message_write_max_retries: int = 3
+
+    # Background conversation titling
+    title_queue_size: int = 1000
+    title_batch_size: int = 20  # conversations titled per LLM call
+    title_flush_interval: float = 1.0
+
+    # Opt-in request profiling: send "X-Profile: <token>" to sample that request
+    profiling_token: str | None = None  # unset disables the profiling middleware
+    profiling_output_dir: str = "profiles"
+    profiling_interval_seconds: float = 0.005
 
     class Config:
         env_file = ".env"
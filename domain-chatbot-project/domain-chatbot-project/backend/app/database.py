@@ -1,13 +1,47 @@
 # app/database.py
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
+from app.utils.metrics import DB_POOL_CHECKOUT_WAIT_SECONDS
+
+def _async_database_url(url: str) -> str:
+    """Swap the sync DBAPI driver in the URL for its asyncio counterpart"""
+    drivers = {
+        "postgresql+psycopg2://": "postgresql+asyncpg://",
+        "postgresql://": "postgresql+asyncpg://",
+        "sqlite://": "sqlite+aiosqlite://",
+    }
+    for sync_prefix, async_prefix in drivers.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+class _CheckoutTimingMixin:
+    """Pool mixin that records how long each checkout waits for a connection"""
+    engine_label = "sync"
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(engine=self.engine_label).observe(time.perf_counter() - started_at)
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    engine_label = "sync"
+
+class TimedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
 
 # Create database engine
 # Engine is the core interface to the database
 engine = create_engine(
     settings.database_url,
+    poolclass=TimedQueuePool,
     # Connection pool settings for better performance
     pool_size=10,
     max_overflow=20,
@@ -19,6 +53,20 @@ engine = create_engine(
 # SessionLocal will be used to create database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for routes that run on the event loop (e.g. streaming chat),
+# so database round trips don't stall other requests on the same worker
+async_engine = create_async_engine(
+    _async_database_url(settings.database_url),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=300,
+)
+
+# expire_on_commit=False: objects stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class for our models
 # All database models will inherit from this Base class
 Base = declarative_base()
@@ -36,8 +84,16 @@ def get_db():
     finally:
         db.close()  # Always close the session when done
 
+async def get_async_db():
+    """
+    Async counterpart of get_db for async route functions.
+    The session is closed when the request completes.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Why this structure?
 # 1. Engine: Manages database connections and connection pool
 # 2. SessionLocal: Factory for creating database sessions
 # 3. Base: Common base class for all our database models
-# 4. get_db(): Dependency injection pattern for database sessions
\ No newline at end of file
+# 4. get_db(): Dependency injection pattern for database sessions
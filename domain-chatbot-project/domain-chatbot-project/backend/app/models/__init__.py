@@ -8,9 +8,10 @@ from .user import User
 from .domain import Domain
 from .conversation import Conversation
 from .message import Message
+from .conversation_summary import ConversationSummary
 
 # Export all models
-__all__ = ["User", "Domain", "Conversation", "Message"]
+__all__ = ["User", "Domain", "Conversation", "Message", "ConversationSummary"]
 
 # Why this approach?
 # 1. Clean imports: `from app.models import User` instead of `from app.models.user import User`
@@ -1,5 +1,5 @@
 # app/models/conversation.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index, func, true
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -19,6 +19,8 @@ class Conversation(Base):
     
     # Conversation metadata
     title = Column(String(255), nullable=True)  # Optional title for the conversation
+    # True until the title worker has named the conversation or the user renamed it
+    needs_title = Column(Boolean, nullable=False, default=True, server_default=true())
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -31,6 +33,13 @@ class Conversation(Base):
     domain = relationship("Domain", back_populates="conversations")
     # One conversation can have many messages
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    # Rolling summary of older messages (at most one per conversation)
+    summary = relationship("ConversationSummary", back_populates="conversation", uselist=False, cascade="all, delete-orphan")
+
+    # The conversation list is paged per user in updated_at order
+    __table_args__ = (
+        Index("ix_conversations_user_id_updated_at", "user_id", "updated_at"),
+    )
     
     def __repr__(self):
         return f"<Conversation(id={self.id}, user_id={self.user_id}, domain_id={self.domain_id}, title='{self.title}')>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ConversationSummary(Base):
+    """
+    Rolling summary of a conversation's older messages.
+
+    Messages up to summarized_until_id are folded into summary; prompts use the
+    summary plus the messages after it instead of the raw older turns.
+    """
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    # Last message folded into the summary, and how many messages that covers
+    summarized_until_id = Column(Integer, nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationship
+    conversation = relationship("Conversation", back_populates="summary")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -15,6 +15,8 @@ class Message(Base):
     # Add constraint to ensure role is either 'user' or 'assistant'
     __table_args__ = (
         CheckConstraint("role IN ('user', 'assistant')", name="check_role"),
+        # History queries filter by conversation and sort by time
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
     )
     
     # Relationship
@@ -1,33 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.user import UserCreate, UserOut
 from app.schemas.auth import Token
 from app.services import auth_service
 from pydantic import BaseModel
 from app.schemas.auth import Token, LoginRequest
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, Principal
+from app.config import settings
 from app.schemas.user import UserOut
-from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/signup", response_model=UserOut)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    return auth_service.create_user(user, db)
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await auth_service.create_user(user, db)
 
 @router.post("/login", response_model=Token)
-def login(form_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(form_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     print("Login endpoint called with:", form_data.username)
-    user = auth_service.authenticate_user(form_data.username, form_data.password, db)
+    user = await auth_service.authenticate_user(form_data.username, form_data.password, db)
     print("User found:", user)
     if not user:
         print("Invalid credentials")
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    token = auth_service.generate_token(user.id)
+    claims = Principal.from_user(user).to_claims() if settings.auth_claims_only else None
+    token = auth_service.generate_token(user.id, claims)
     print("Token generated:", token)
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
\ No newline at end of file
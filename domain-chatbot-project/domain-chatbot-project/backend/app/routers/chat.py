@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from app.database import get_async_db
 from app.schemas.message import Message, MessageCreate
-from app.services.conversation_service import ConversationService
-from app.services.message_service import MessageService
-from app.services.domain_service import DomainService
+from app.services.conversation_service import AsyncConversationService
+from app.services.message_service import AsyncMessageService
+from app.services.domain_service import AsyncDomainService
+from app.ai.context_assembler import context_assembler
 from app.services.ai_service import ai_service
-from app.utils.dependencies import get_current_user
-from app.models.user import User
-from app.schemas.domain import Domain as DomainSchema
+from app.services.message_writer import MessageWriteFailed, message_writer
+from app.services.summary_service import AsyncSummaryService, conversation_summarizer
+from app.services.title_worker import TitleRequest, title_worker
+from app.utils.dependencies import get_current_user, Principal
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 class ChatRequest(BaseModel):
@@ -21,28 +23,31 @@ class ChatResponse(BaseModel):
     user_message: Message
     ai_response: Message
 
+def _queue_title(conversation, domain_data, message: str):
+    """Have the title worker name a conversation that hasn't been titled (or renamed) yet"""
+    title_worker.enqueue(TitleRequest(conversation.id, domain_data.name, message))
+
 @router.post("/{conversation_id}/stream")
 async def stream_message(
     conversation_id: int,
     chat_request: ChatRequest,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
     length: str = "medium"  # "short", "medium", "long"
 ):
     """Send a message and stream AI response"""
 
     # Verify conversation belongs to user
-    conversation = ConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
+    conversation = await AsyncConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Get domain information
-    domain = DomainService.get_domain_by_id(db, conversation.domain_id)
-    if not domain:
+    # Get domain information (served from the in-process catalog)
+    domain_data = await AsyncDomainService.get_domain_by_id(db, conversation.domain_id)
+    if not domain_data:
         raise HTTPException(status_code=400, detail="Invalid domain")
-    
-    domain_data= DomainSchema.from_orm(domain)
 
     # Create user message
     user_message_data = MessageCreate(
@@ -50,10 +55,14 @@ async def stream_message(
         role="user",
         content=chat_request.message
     )
-    user_message = MessageService.create_message(db, user_message_data)
-
-    # Get conversation history for context
-    conversation_history = MessageService.get_conversation_history(db, conversation_id, limit=10)
+    user_message = await AsyncMessageService.create_message(db, user_message_data)
+    if conversation.needs_title:
+        _queue_title(conversation, domain_data, chat_request.message)
+
+    # Get conversation history for context, including any reply still being written
+    await message_writer.wait_for_conversation(conversation_id)
+    conversation_history = await AsyncMessageService.get_conversation_history(db, conversation_id, limit=context_assembler.history_limit)
+    summary = await AsyncSummaryService.get_summary(db, conversation_id)
     ai_response_buffer = []
     # Streaming generator for AI response
     async def event_generator():
@@ -63,7 +72,8 @@ async def stream_message(
                 message_content=chat_request.message,
                 conversation_history=conversation_history,
                 conversation_id=conversation_id,
-                length=length
+                length=length,
+                summary=summary
             ):
                 ai_response_buffer.append(chunk)
                 yield chunk
@@ -78,46 +88,62 @@ async def stream_message(
                 role="assistant",
                 content=full_ai_response
             )
-        MessageService.create_message(db, ai_message_data)
+            # Persisted in batches by the write-behind worker; wait for the commit
+            # so the summarizer and the next turn see this reply
+            saved = await message_writer.enqueue(ai_message_data)
+            try:
+                await saved
+            except MessageWriteFailed:
+                yield "\n[Error]: This reply could not be saved to the conversation history."
+
+    # Runs once the stream has finished
+    background_tasks.add_task(conversation_summarizer.update_if_due, conversation_id, domain_data.name)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
   
 @router.post("/{conversation_id}", response_model=ChatResponse)
-def send_message(
+async def send_message(
     conversation_id: int,
     chat_request: ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+    mode: Optional[str] = None  # "single_pass", "analyze_generate", "full"; defaults per domain
 ):
     """Send a message and get AI response"""
 
     # Verify conversation belongs to user
-    conversation = ConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
+    conversation = await AsyncConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Get domain information
-    domain = DomainService.get_domain_by_id(db, conversation.domain_id)
-    if not domain:
+    # Get domain information (served from the in-process catalog)
+    domain_data = await AsyncDomainService.get_domain_by_id(db, conversation.domain_id)
+    if not domain_data:
         raise HTTPException(status_code=400, detail="Invalid domain")
-    domain_data = DomainSchema.from_orm(domain)
     # Create user message
     user_message_data = MessageCreate(
         conversation_id=conversation_id,
         role="user",
         content=chat_request.message
     )
-    user_message = MessageService.create_message(db, user_message_data)
+    user_message = await AsyncMessageService.create_message(db, user_message_data)
+    if conversation.needs_title:
+        _queue_title(conversation, domain_data, chat_request.message)
 
-    # Get conversation history for context
-    conversation_history = MessageService.get_conversation_history(db, conversation_id, limit=10)
+    # Get conversation history for context; the AI service runs this alongside its other independent steps
+    async def load_history():
+        await message_writer.wait_for_conversation(conversation_id)
+        conversation_history = await AsyncMessageService.get_conversation_history(db, conversation_id, limit=context_assembler.history_limit)
+        return conversation_history, await AsyncSummaryService.get_summary(db, conversation_id)
 
     # Generate AI response
-    ai_response_content = ai_service.generate_response(
+    ai_response_content = await ai_service.agenerate_response(
         domain=domain_data,
         message_content=chat_request.message,
-        conversation_history=conversation_history,
-        conversation_id=conversation_id
+        conversation_id=conversation_id,
+        pipeline_mode=mode,
+        history_loader=load_history
     )
 
     # Create AI message
@@ -126,7 +152,8 @@ def send_message(
         role="assistant",
         content=ai_response_content
     )
-    ai_message = MessageService.create_message(db, ai_message_data)
+    ai_message = await AsyncMessageService.create_message(db, ai_message_data)
+    background_tasks.add_task(conversation_summarizer.update_if_due, conversation_id, domain_data.name)
 
     return ChatResponse(
         user_message=user_message,
@@ -134,17 +161,18 @@ def send_message(
     )
 
 @router.get("/{conversation_id}/history", response_model=List[Message])
-def get_chat_history(
+async def get_chat_history(
     conversation_id: int,
-    limit: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(50, ge=0, description="Messages per page; 0 returns the whole history"),
+    before_id: Optional[int] = Query(None, description="Only return messages older than this message ID"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get chat history for a conversation"""
+    """Get a page of chat history; pass the oldest returned ID as before_id for the previous page"""
 
     # Verify conversation belongs to user
-    conversation = ConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
+    conversation = await AsyncConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    return MessageService.get_conversation_history(db, conversation_id, limit)
\ No newline at end of file
+    return await AsyncMessageService.get_conversation_history(db, conversation_id, limit, before_id)
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.database import get_db
 from app.schemas.conversation import Conversation, ConversationCreate, ConversationUpdate
-from app.services.conversation_service import ConversationService
+from app.services.conversation_service import (
+    ConversationService,
+    InvalidCursorError,
+    encode_conversation_cursor,
+)
 from app.services.domain_service import DomainService
-from app.utils.dependencies import get_current_user
-from app.models.user import User
+from app.utils.dependencies import get_current_user, Principal
 from app.schemas.conversation import ConversationWithMessages
 from app.services.message_service import MessageService
 
@@ -15,25 +18,30 @@ router = APIRouter(prefix="/conversations", tags=["conversations"])
 @router.get("/{conversation_id}/messages", response_model=ConversationWithMessages)
 def get_conversation_with_messages(
     conversation_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size; omit to load all messages"),
+    before_id: Optional[int] = Query(None, description="Only return messages older than this message ID"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get conversation with all messages"""
+    """Get conversation with its messages, optionally one page at a time"""
     conversation = ConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = MessageService.get_conversation_messages(db, conversation_id)
+    messages = MessageService.get_conversation_messages(db, conversation_id, limit, before_id)
+    # A full page means there may be older messages
+    next_before_id = messages[0].id if limit and len(messages) == limit else None
     conversation_dict = {
         **conversation.__dict__,
-        "messages": messages
+        "messages": messages,
+        "next_before_id": next_before_id
     }
     return ConversationWithMessages(**conversation_dict)
 @router.post("/", response_model=Conversation)
 def create_conversation(
     conversation: ConversationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new conversation"""
     # Validate domain exists
@@ -45,18 +53,31 @@ def create_conversation(
 
 @router.get("/", response_model=List[Conversation])
 def get_conversations(
+    response: Response,
     domain_id: Optional[int] = Query(None, description="Filter by domain ID"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size; omit to list all"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    include_total: bool = Query(False, description="Return the total count in X-Total-Count"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get user's conversations, optionally filtered by domain"""
-    return ConversationService.get_user_conversations(db, current_user.id, domain_id)
+    """Get user's conversations (most recently updated first), optionally filtered by domain"""
+    try:
+        conversations = ConversationService.get_user_conversations(db, current_user.id, domain_id, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if limit and len(conversations) == limit:
+        response.headers["X-Next-Cursor"] = encode_conversation_cursor(conversations[-1])
+    if include_total:
+        response.headers["X-Total-Count"] = str(ConversationService.count_user_conversations(db, current_user.id, domain_id))
+    return conversations
 
 @router.get("/{conversation_id}", response_model=Conversation)
 def get_conversation(
     conversation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get specific conversation"""
     conversation = ConversationService.get_conversation_by_id(db, conversation_id, current_user.id)
@@ -69,7 +90,7 @@ def update_conversation(
     conversation_id: int,
     update_data: ConversationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update conversation (mainly title)"""
     conversation = ConversationService.update_conversation(db, conversation_id, current_user.id, update_data)
@@ -81,7 +102,7 @@ def update_conversation(
 def delete_conversation(
     conversation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete conversation"""
     success = ConversationService.delete_conversation(db, conversation_id, current_user.id)
@@ -0,0 +1,59 @@
+import anyio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from app.ai.admission import UpstreamOverloaded
+from app.config import settings
+from app.services.image_service import ImageTooLarge, image_service
+from app.services.image_store import image_store
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+@router.get("/jobs/{job_id}")
+async def get_image_job(job_id: str):
+    """Get the status of an image generation job"""
+    job = await image_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "image_url": job.image_url,
+        "error": job.error
+    }
+
+@router.get("/jobs/{job_id}/image")
+async def get_image_job_result(job_id: str):
+    """Serve the finished image, waiting briefly if the job is still running"""
+    job = await image_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Image job not found")
+
+    job = await image_service.wait_for_job(job, timeout=settings.image_timeout_seconds)
+    if job.status == "done":
+        return RedirectResponse(job.image_url)
+    if job.status == "failed":
+        raise HTTPException(status_code=502, detail=job.error or "Image generation failed")
+    raise HTTPException(status_code=504, detail="Image is still being generated")
+
+@router.get("/live/{key}")
+async def get_live_image(key: str):
+    """Proxy a generated image to the client as it downloads, or redirect to the stored copy"""
+    prompt = await image_service.get_stored_prompt(key)
+    if prompt is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    filename = await anyio.to_thread.run_sync(image_store.get, key)
+    if filename is not None:
+        return RedirectResponse(image_service.public_url(filename))
+
+    try:
+        content_type, body = await image_service.open_passthrough(key, prompt)
+    except UpstreamOverloaded:
+        raise
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        print(f"Pass-through image error: {e}")
+        raise HTTPException(status_code=502, detail="Image generation failed")
+    return StreamingResponse(body, media_type=content_type, headers={"Cache-Control": "no-store"})
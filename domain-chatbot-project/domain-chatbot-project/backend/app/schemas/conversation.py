@@ -24,4 +24,6 @@ class Conversation(ConversationBase):
         from_attributes = True
 
 class ConversationWithMessages(Conversation):
-    messages: List[Message] = []
\ No newline at end of file
+    messages: List[Message] = []
+    # Cursor for the previous page when messages were paginated
+    next_before_id: Optional[int] = None
\ No newline at end of file
@@ -1,38 +1,70 @@
-from typing import List, Dict
-from app.models.domain import Domain
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
 from app.models.message import Message
-from app.ai.domain_router import domain_router
-from app.ai.chat_engine import chat_engine
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
-import os
-import google.generativeai as genai
+from app.ai.admission import UpstreamOverloaded
+from app.ai.llm_registry import llm_registry
+from app.ai.context_assembler import context_assembler
 import asyncio
+import functools
+import json
+import time
 from app.schemas.domain import Domain as DomainSchema
 import re
 import requests
-import uuid
-from datetime import datetime
+from app.config import settings
+from app.services.image_service import image_service
+from app.services.summary_service import conversation_summarizer
+from app.utils.metrics import FALLBACK_RESPONSES_TOTAL, URL_FETCH_SECONDS
+from app.utils.task_graph import TaskGraph
 
-# Add these imports for image generation
-# (PIL.Image and aiohttp removed as they're not used in this implementation)
+# Marks the end of a buffered stream
+_STREAM_END = object()
 
 
 class AIService:
+    """
+    Entry point for AI replies.
+
+    Construction is cheap: LangChain/LangGraph are only imported, and the
+    router graphs and chat engine only built, on first use or in warmup().
+    """
+
     def __init__(self):
-        # Configure Google Gemini API
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.domain_router = domain_router
-        self.chat_engine = chat_engine
-        # Initialize Gemini for title generation
-        self.title_llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-preview-05-20",
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        
-        # Pollinations API settings
-        self.pollinations_base_url = "https://image.pollinations.ai/prompt"
+        self._title_llm = None
+
+    @property
+    def domain_router(self):
+        from app.ai.domain_router import get_domain_router
+        return get_domain_router()
+
+    @property
+    def chat_engine(self):
+        from app.ai.chat_engine import get_chat_engine
+        return get_chat_engine()
+
+    def warmup(self) -> Dict[str, float]:
+        """Build the AI stack ahead of the first request; returns seconds per phase"""
+        timings = {}
+        for phase, build in (
+            ("domain_router", lambda: self.domain_router),
+            ("chat_engine", lambda: self.chat_engine),
+            ("llm_clients", lambda: (self.domain_router.llm, self.title_llm)),
+        ):
+            started_at = time.perf_counter()
+            build()
+            timings[phase] = time.perf_counter() - started_at
+        return timings
+
+    @property
+    def title_llm(self):
+        """Lower-temperature Gemini client for title generation, from the LLM registry"""
+        if self._title_llm is None:
+            self._title_llm = llm_registry.get(temperature=0.3)
+        return self._title_llm
+
+    @staticmethod
+    def _domain_name(domain) -> str:
+        """Accept a catalog DomainSchema, an ORM Domain or a plain domain name"""
+        return domain.name if hasattr(domain, "name") else domain
 
     def _detect_image_request(self, message_content: str) -> bool:
         """Detect if the user is requesting image generation"""
@@ -64,51 +96,10 @@ class AIService:
         
         return prompt.strip()
 
-    def _generate_image(self, prompt: str, domain_name: str) -> str:
-        try:
-            # Enhance prompt based on domain
-            enhanced_prompt = self._enhance_prompt_by_domain(prompt, domain_name)
-            
-            # URL encode the prompt
-            import urllib.parse
-            encoded_prompt = urllib.parse.quote(enhanced_prompt)
-            
-            # Pollinations API parameters
-            params = {
-                'width': 512,
-                'height': 512,
-                'seed': -1,  # Random seed
-                'model': 'flux',  # You can use 'flux' or other available models
-                'enhance': 'true'
-            }
-            
-            # Build the URL
-            param_string = '&'.join([f"{k}={v}" for k, v in params.items()])
-            image_url = f"{self.pollinations_base_url}/{encoded_prompt}?{param_string}"
-            
-            # Download the image
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Save image locally
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"generated_{timestamp}_{uuid.uuid4().hex[:8]}.png"
-            filepath = os.path.join("static", "generated_images", filename)
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            # Save the image
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            # Return the full URL instead of relative path
-            # Assuming your FastAPI runs on port 8000, adjust if different
-            return f"http://localhost:8000/static/generated_images/{filename}"
-            
-        except Exception as e:
-            print(f"Pollinations image generation error: {e}")
-            return None
+    async def _generate_image(self, prompt: str, domain_name: str) -> str:
+        """Generate an image without blocking the event loop"""
+        enhanced_prompt = self._enhance_prompt_by_domain(prompt, domain_name)
+        return await image_service.generate_image(enhanced_prompt)
 
     def _enhance_prompt_by_domain(self, prompt: str, domain_name: str) -> str:
         """Enhance the prompt based on the domain"""
@@ -121,24 +112,53 @@ class AIService:
         print(f"Enhanced prompt for {domain_name}: {enhanced}")  # Debug log
         return enhanced
 
-    def generate_response(self, domain: Domain, message_content: str, conversation_history: List[Message], conversation_id: int, length: str = "medium") -> str:
+    async def agenerate_response(
+        self,
+        domain: DomainSchema,
+        message_content: str,
+        conversation_history: Optional[List[Message]] = None,
+        conversation_id: int = None,
+        length: str = "medium",
+        pipeline_mode: str = None,
+        summary=None,
+        history_loader: Optional[Callable[[], Awaitable[Tuple[List[Message], object]]]] = None
+    ) -> str:
+        """
+        Non-streaming reply, with independent steps run concurrently.
+
+        history_loader, if given, is an async callable returning
+        (conversation_history, summary), so history loads while the URL is
+        fetched. For image requests the image download and the description
+        are generated at the same time.
+        """
         try:
-            # Convert Domain to schema if it's a SQLAlchemy model
-            if isinstance(domain, Domain):
-                domain_data = DomainSchema.from_orm(domain)
-                domain_name = domain_data.name
-            else:
-                domain_name = domain.name if hasattr(domain, "name") else domain
+            domain_name = self._domain_name(domain)
 
             print(f"Domain: {domain_name}, Message: {message_content}")  # Debug log
 
-            history_dicts = []
-            for msg in conversation_history:
-                history_dicts.append({
-                    'role': msg.role,
-                    'content': msg.content,
-                    'timestamp': msg.created_at.isoformat() if hasattr(msg.created_at, 'isoformat') else str(msg.created_at)
-                })
+            graph = TaskGraph(f"generate_response/{domain_name}")
+            if history_loader is not None:
+                graph.add("history", history_loader)
+            else:
+                async def given_history():
+                    return conversation_history or [], summary
+                graph.add("history", given_history)
+
+            async def build_context(history, url_content=""):
+                messages, history_summary = history
+                extra = f"Here is the latest article or news content provided by the user:\n{url_content}" if url_content else ""
+                return self._build_context(domain_name, length, messages, message_content, extra, history_summary)
+
+            def answer(query: str):
+                def run(context):
+                    return self.domain_router.generate_response(
+                        domain=domain_name,
+                        user_query=query,
+                        context=context,
+                        mode=pipeline_mode,
+                        length=length
+                    )
+                return run
 
             # Check for image generation request in entertainment/technical domains
             is_image_request = self._detect_image_request(message_content)
@@ -150,38 +170,35 @@ class AIService:
                 print("Generating image...")  # Debug log
                 
                 image_prompt = self._extract_image_prompt(message_content)
-                image_url = self._generate_image(image_prompt, domain_name)
+
+                # Generate text response about the image with length control
+                length_instruction = {
+                    "short": "Give a brief description in 1-2 sentences.",
+                    "medium": "Give a moderate description in 2-4 sentences.", 
+                    "long": "Give a detailed description in 4-6 sentences."
+                }.get(length, "Give a moderate description in 2-4 sentences.")
                 
-                if image_url:
-                    # Generate text response about the image with length control
-                    length_instruction = {
-                        "short": "Give a brief description in 1-2 sentences.",
-                        "medium": "Give a moderate description in 2-4 sentences.", 
-                        "long": "Give a detailed description in 4-6 sentences."
-                    }.get(length, "Give a moderate description in 2-4 sentences.")
-                    
-                    # Add length instruction directly to the query
-                    enhanced_query = f"I generated an image based on: {image_prompt}. {length_instruction}"
-                    
-                    text_response = self.domain_router.generate_response(
-                        domain=domain_name,
-                        user_query=enhanced_query,
-                        conversation_history=history_dicts,
-                        context=self._build_context(conversation_history)
-                    )
-                    return f"[image]{image_url}[/image]\n\n{text_response}"
+                # Add length instruction directly to the query
+                enhanced_query = f"I generated an image based on: {image_prompt}. {length_instruction}"
+
+                # The description only needs the prompt, so it is written while the image downloads
+                graph.add("context", build_context, "history")
+                graph.add("image_url", functools.partial(self._generate_image, image_prompt, domain_name))
+                graph.add("description", answer(enhanced_query), "context")
+                results = await graph.run()
+
+                if results["image_url"]:
+                    return f"[image]{results['image_url']}[/image]\n\n{results['description']}"
                 else:
                     return "I apologize, but I'm unable to generate images right now. The image service might be temporarily unavailable. Please try again later."
 
             # Handle regular text responses with proper length control
             url = self._extract_url(message_content)
-            url_content = ""
             if url and domain_name.lower() == "stock":
-                url_content = self._fetch_url_content(url)
-
-            context = self._build_context(conversation_history)
-            if url_content:
-                context = f"Here is the latest article or news content provided by the user:\n{url_content}\n\n" + context
+                graph.add("url_content", functools.partial(self._fetch_url_content, url))
+                graph.add("context", build_context, "history", "url_content")
+            else:
+                graph.add("context", build_context, "history")
 
             # Create stronger length instruction with token limits
             length_instructions = {
@@ -195,38 +212,42 @@ class AIService:
             # Add stronger length control to the query
             enhanced_query = f"RESPONSE LENGTH LIMIT: {length_instruction}\n\nUser Question: {message_content}\n\nRemember: Strictly follow the word limit above."
 
-            response = self.domain_router.generate_response(
-                domain=domain_name,
-                user_query=enhanced_query,
-                conversation_history=history_dicts,
-                context=context
-            )
+            graph.add("answer", answer(enhanced_query), "context")
+            response = (await graph.run())["answer"]
 
             # Enforce length limits if AI didn't follow instructions
             response = self._enforce_length_limit(response, length)
 
             return response
 
+        except UpstreamOverloaded:
+            # Surfaces as a 503 with Retry-After (see the handler in main.py)
+            raise
         except Exception as e:
             print(f"AI Service error: {e}")
             domain_name = getattr(domain, 'name', 'general') if hasattr(domain, 'name') else 'general'
             return self._get_fallback_response(domain_name, message_content)
 
+    @staticmethod
+    def _enforce_length_limit(response: str, length: str) -> str:
+        """Trim replies that ignore the word limit given in the prompt"""
+        max_words = {"short": 30, "medium": 80, "long": 150}.get(length, 80)
+        words = response.split()
+        if len(words) <= max_words:
+            return response
+        return " ".join(words[:max_words]).rstrip(".,;:") + "..."
+
     async def stream_ai_response(
         self,
         domain,
         message_content,
         conversation_history,
         conversation_id,
-        length="medium"
+        length="medium",
+        summary=None
     ):
         try:
-            # Convert Domain to schema if it's a SQLAlchemy model
-            if isinstance(domain, Domain):
-                domain_data = DomainSchema.from_orm(domain)
-                domain_name = domain_data.name
-            else:
-                domain_name = domain.name if hasattr(domain, "name") else domain
+            domain_name = self._domain_name(domain)
             
             # Check for image generation request in entertainment/technical domains
             if (domain_name.lower() in ["entertainment", "technical"] and 
@@ -235,53 +256,77 @@ class AIService:
                 yield "🎨 Generating image..."
                 
                 image_prompt = self._extract_image_prompt(message_content)
-                image_url = self._generate_image(image_prompt, domain_name)
-                
-                if image_url:
-                    yield f"\n[image]{image_url}[/image]\n\n"
-                    
-                    # Generate a text response about the image with length control
-                    context = self._build_context(conversation_history)
-                    max_tokens = {"short": 100, "medium": 300, "long": 700}.get(length, 300)
-                    
-                    # Stream the description with length control
-                    async for chunk in self.chat_engine.stream_response(
+                if settings.image_job_mode:
+                    # Hand back a placeholder URL right away; it serves the image when ready
+                    job = await image_service.submit_job(self._enhance_prompt_by_domain(image_prompt, domain_name))
+                    image_step = asyncio.sleep(0, result=image_service.job_image_url(job.id))
+                elif settings.image_passthrough_mode:
+                    # The URL proxies the bytes to the browser as Pollinations sends them
+                    passthrough_url = await image_service.passthrough_url(self._enhance_prompt_by_domain(image_prompt, domain_name))
+                    image_step = asyncio.sleep(0, result=passthrough_url)
+                else:
+                    image_step = self._generate_image(image_prompt, domain_name)
+
+                # Generate a text response about the image with length control,
+                # buffered while the image downloads so the image still comes first
+                context = self._build_context(domain_name, length, conversation_history, message_content, summary=summary)
+                description = asyncio.Queue()
+                description_task = asyncio.create_task(self._buffer_stream(
+                    self.chat_engine.stream_response(
                         domain=domain_name,
                         user_input=f"I generated an image based on: {image_prompt}. Describe what you created in {length} length.",
                         conversation_id=conversation_id,
-                        max_tokens=max_tokens,
-                        context=context
-                    ):
+                        context=context,
+                        length=length
+                    ),
+                    description
+                ))
+                try:
+                    image_url = await image_step
+                    if not image_url:
+                        yield "\n❌ I apologize, but I'm unable to generate images right now. The Pollinations service might be temporarily unavailable. Please try again later."
+                        return
+
+                    yield f"\n[image]{image_url}[/image]\n\n"
+                    while (chunk := await description.get()) is not _STREAM_END:
+                        if isinstance(chunk, BaseException):
+                            raise chunk
                         yield chunk
                         await asyncio.sleep(0)
-                else:
-                    yield "\n❌ I apologize, but I'm unable to generate images right now. The Pollinations service might be temporarily unavailable. Please try again later."
+                finally:
+                    description_task.cancel()
                 return
             
-            history_dicts = []
-            for msg in conversation_history:
-                history_dicts.append({
-                    'role': msg.role,
-                    'content': msg.content,
-                    'timestamp': msg.created_at.isoformat() if hasattr(msg.created_at, 'isoformat') else str(msg.created_at)
-                })
-
-            context = self._build_context(conversation_history)
-            max_tokens = {"short": 100, "medium": 300, "long": 700}.get(length, 300)
+            context = self._build_context(domain_name, length, conversation_history, message_content, summary=summary)
 
             async for chunk in self.chat_engine.stream_response(
                 domain=domain_name,
                 user_input=message_content,
                 conversation_id=conversation_id,
-                max_tokens=max_tokens,
-                context=context
+                context=context,
+                length=length
             ):
                 yield chunk
                 await asyncio.sleep(0)
 
+        except UpstreamOverloaded as e:
+            # The stream has already started, so answer with the fallback instead of a 503
+            print(f"Stream shed: {e}")
+            yield self._get_fallback_response(self._domain_name(domain), message_content)
         except Exception as e:
             yield f"\n[Error]: {str(e)}"
 
+    @staticmethod
+    async def _buffer_stream(chunks, queue: asyncio.Queue):
+        """Copy an async stream into a queue, then an error (if any) and _STREAM_END"""
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(_STREAM_END)
+
     # ... rest of the existing methods remain the same ...
     def generate_conversation_title(self, domain_name: str, first_message: str) -> str:
         """Generate a conversation title based on the first message using Gemini"""
@@ -295,19 +340,63 @@ Create a concise title that captures the main topic. Do not use quotes around th
 
 Title:"""
 
+            from langchain.schema import HumanMessage
             messages = [HumanMessage(content=prompt)]
             response = self.title_llm.invoke(messages)
-            title = response.content.strip().strip('"').strip("'")
+            return self._clean_title(response.content)
 
-            # Ensure title isn't too long
-            if len(title) > 50:
-                title = title[:47] + "..."
+        except Exception as e:
+            print(f"Title generation error: {e}")
+            return self._fallback_title(domain_name)
 
-            return title
+    async def generate_conversation_titles(self, conversations: List[Tuple[int, str, str]]) -> Dict[int, str]:
+        """
+        Titles for several conversations from one Gemini call.
 
+        Takes (conversation_id, domain_name, first_message) tuples and returns
+        a title for every id; any the model skipped (or every one, if the call
+        fails) gets the fallback title.
+        """
+        titles = {}
+        try:
+            items = [
+                {"id": conversation_id, "domain": domain_name, "first_message": first_message[:500]}
+                for conversation_id, domain_name, first_message in conversations
+            ]
+            prompt = f"""Generate a short, descriptive title (maximum 50 characters) for each conversation below, based on its first message.
+
+Conversations (JSON):
+{json.dumps(items, ensure_ascii=False)}
+
+Respond with only a JSON object mapping each conversation id to its title, for example {{"12": "Index Funds vs ETFs"}}. Do not use quotes inside titles."""
+
+            from langchain.schema import HumanMessage
+            response = await self.title_llm.ainvoke([HumanMessage(content=prompt)])
+            raw = response.content.strip()
+            # Models often wrap JSON in a code fence
+            raw = raw[raw.find("{"):raw.rfind("}") + 1]
+            for conversation_id, title in json.loads(raw).items():
+                if isinstance(title, str) and title.strip():
+                    titles[int(conversation_id)] = self._clean_title(title)
         except Exception as e:
-            print(f"Title generation error: {e}")
-            return f"New {domain_name.title()} Chat"
+            print(f"Batch title generation error: {e}")
+
+        return {
+            conversation_id: titles.get(conversation_id) or self._fallback_title(domain_name)
+            for conversation_id, domain_name, _ in conversations
+        }
+
+    @staticmethod
+    def _clean_title(title: str) -> str:
+        title = title.strip().strip('"').strip("'")
+        # Ensure title isn't too long
+        if len(title) > 50:
+            title = title[:47] + "..."
+        return title
+
+    @staticmethod
+    def _fallback_title(domain_name: str) -> str:
+        return f"New {domain_name.title()} Chat"
 
     def _extract_url(self, text: str) -> str:
         url_pattern = r'(https?://[^\s]+)'
@@ -315,36 +404,37 @@ Title:"""
         return match.group(0) if match else None
 
     def _fetch_url_content(self, url: str) -> str:
+        started_at = time.perf_counter()
+        outcome = "error"
         try:
             response = requests.get(url, timeout=5)
             response.raise_for_status()
+            outcome = "success"
             # Return only the first 2000 characters to avoid prompt overflow
             return response.text[:2000]
         except Exception as e:
             print(f"Error fetching URL content: {e}")
             return ""
-
-    def _build_context(self, conversation_history: List[Message]) -> str:
-        """Build context string from recent conversation history"""
-        if not conversation_history:
-            return "This is the start of a new conversation."
-
-        recent_messages = conversation_history[-5:]  # Last 5 messages for context
-        context_parts = []
-
-        for msg in recent_messages:
-            try:
-                role = "User" if msg.role == "user" else "Assistant"
-                content_preview = msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
-                context_parts.append(f"{role}: {content_preview}")
-            except Exception as e:
-                print(f"Error processing message in context: {e}")
-                continue
-
-        return "Recent conversation context:\n" + "\n".join(context_parts)
+        finally:
+            URL_FETCH_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started_at)
+
+    def _build_context(
+        self, domain_name: str, length: str, conversation_history: List[Message], message_content: str,
+        extra: str = "", summary=None
+    ) -> str:
+        """Conversation context for the prompt, packed within the domain's token budget"""
+        return context_assembler.assemble(
+            domain=domain_name,
+            length=length,
+            history=conversation_summarizer.select_recent(summary, conversation_history),
+            current_message=message_content,
+            extra=extra,
+            summary=summary.summary if summary else "",
+        ).text
 
     def _get_fallback_response(self, domain_name: str, message_content: str) -> str:
         """Fallback response when AI services fail"""
+        FALLBACK_RESPONSES_TOTAL.labels(domain=domain_name, source="ai_service").inc()
         fallback_responses = {
             "stock": f"I understand you're asking about '{message_content}' regarding financial markets. I'm currently experiencing technical difficulties, but I'd be happy to help with your stock market questions once I'm back online.",
             "law": f"I see you have a legal question about '{message_content}'. I'm having technical issues right now, but I'd like to help with general legal information once my systems are restored.",
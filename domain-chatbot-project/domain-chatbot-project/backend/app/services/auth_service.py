@@ -1,10 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.utils.security import hash_password_async, verify_and_update_password_async, create_access_token
 
-def create_user(user_data: UserCreate, db: Session):
-    hashed_pw = hash_password(user_data.password)
+async def create_user(user_data: UserCreate, db: AsyncSession):
+    hashed_pw = await hash_password_async(user_data.password)
     user = User(
         email=user_data.email,
         username=user_data.username,
@@ -12,15 +13,23 @@ def create_user(user_data: UserCreate, db: Session):
         full_name=user_data.full_name
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
-def authenticate_user(username: str, password: str, db: Session):
-    user = db.query(User).filter(User.username == username).first()
-    if user and verify_password(password, user.password_hash):
-        return user
-    return None
+async def authenticate_user(username: str, password: str, db: AsyncSession):
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    if not user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(password, user.password_hash)
+    if not verified:
+        return None
+    if new_hash:
+        # Stored hash used a different bcrypt cost; upgrade it now that we know the password
+        user.password_hash = new_hash
+        await db.commit()
+    return user
 
-def generate_token(user_id: int):
-    return create_access_token({"sub": str(user_id)})
+def generate_token(user_id: int, claims: dict = None):
+    return create_access_token({**(claims or {}), "sub": str(user_id)})
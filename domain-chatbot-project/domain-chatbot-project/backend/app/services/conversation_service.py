@@ -1,11 +1,63 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from app.models.conversation import Conversation
 from app.models.user import User
 from app.schemas.conversation import ConversationCreate, ConversationUpdate
-from typing import List, Optional
+from app.utils.metrics import observe_db
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor can't be decoded"""
+
+
+def encode_conversation_cursor(conversation: Conversation) -> str:
+    """Opaque cursor pointing just past this conversation in updated_at order"""
+    raw = f"{conversation.updated_at.isoformat()}|{conversation.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_conversation_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        updated_at, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), int(conversation_id)
+    except Exception:
+        raise InvalidCursorError("Invalid conversation cursor")
+
+def _user_conversations_query(
+    user_id: int,
+    domain_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """Newest-first conversations with their domain eagerly joined (no per-row lazy loads)"""
+    query = (
+        select(Conversation)
+        .options(joinedload(Conversation.domain))
+        .where(Conversation.user_id == user_id)
+    )
+    if domain_id:
+        query = query.where(Conversation.domain_id == domain_id)
+    if cursor:
+        updated_at, conversation_id = decode_conversation_cursor(cursor)
+        query = query.where(tuple_(Conversation.updated_at, Conversation.id) < tuple_(updated_at, conversation_id))
+    query = query.order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def _user_conversations_count_query(user_id: int, domain_id: Optional[int] = None):
+    # Counts straight off the conversations index; no ORM entities or joins
+    query = select(func.count(Conversation.id)).where(Conversation.user_id == user_id)
+    if domain_id:
+        query = query.where(Conversation.domain_id == domain_id)
+    return query
 
 class ConversationService:
     @staticmethod
+    @observe_db("ConversationService.create_conversation")
     def create_conversation(db: Session, conversation: ConversationCreate, user_id: int) -> Conversation:
         # Generate title if not provided
         title = conversation.title or f"New {conversation.domain_id} conversation"
@@ -21,13 +73,23 @@ class ConversationService:
         return db_conversation
     
     @staticmethod
-    def get_user_conversations(db: Session, user_id: int, domain_id: Optional[int] = None) -> List[Conversation]:
-        query = db.query(Conversation).filter(Conversation.user_id == user_id)
-        if domain_id:
-            query = query.filter(Conversation.domain_id == domain_id)
-        return query.order_by(Conversation.updated_at.desc()).all()
+    @observe_db("ConversationService.get_user_conversations")
+    def get_user_conversations(
+        db: Session,
+        user_id: int,
+        domain_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> List[Conversation]:
+        return list(db.execute(_user_conversations_query(user_id, domain_id, limit, cursor)).scalars().all())
+
+    @staticmethod
+    @observe_db("ConversationService.count_user_conversations")
+    def count_user_conversations(db: Session, user_id: int, domain_id: Optional[int] = None) -> int:
+        return db.execute(_user_conversations_count_query(user_id, domain_id)).scalar_one()
     
     @staticmethod
+    @observe_db("ConversationService.get_conversation_by_id")
     def get_conversation_by_id(db: Session, conversation_id: int, user_id: int) -> Optional[Conversation]:
         return db.query(Conversation).filter(
             Conversation.id == conversation_id,
@@ -35,6 +97,7 @@ class ConversationService:
         ).first()
     
     @staticmethod
+    @observe_db("ConversationService.update_conversation")
     def update_conversation(db: Session, conversation_id: int, user_id: int, update_data: ConversationUpdate) -> Optional[Conversation]:
         conversation = ConversationService.get_conversation_by_id(db, conversation_id, user_id)
         if not conversation:
@@ -42,12 +105,16 @@ class ConversationService:
         
         for field, value in update_data.dict(exclude_unset=True).items():
             setattr(conversation, field, value)
+            if field == "title":
+                # A title the user chose is never replaced by a generated one
+                conversation.needs_title = False
         
         db.commit()
         db.refresh(conversation)
         return conversation
     
     @staticmethod
+    @observe_db("ConversationService.delete_conversation")
     def delete_conversation(db: Session, conversation_id: int, user_id: int) -> bool:
         conversation = ConversationService.get_conversation_by_id(db, conversation_id, user_id)
         if not conversation:
@@ -55,4 +122,105 @@ class ConversationService:
         
         db.delete(conversation)
         db.commit()
-        return True
\ No newline at end of file
+        return True
+
+
+class AsyncConversationService:
+    """Async counterpart of ConversationService for routes running on the event loop"""
+
+    @staticmethod
+    @observe_db("AsyncConversationService.create_conversation")
+    async def create_conversation(db: AsyncSession, conversation: ConversationCreate, user_id: int) -> Conversation:
+        title = conversation.title or f"New {conversation.domain_id} conversation"
+
+        db_conversation = Conversation(
+            user_id=user_id,
+            domain_id=conversation.domain_id,
+            title=title
+        )
+        db.add(db_conversation)
+        await db.commit()
+        await db.refresh(db_conversation)
+        return db_conversation
+
+    @staticmethod
+    @observe_db("AsyncConversationService.get_user_conversations")
+    async def get_user_conversations(
+        db: AsyncSession,
+        user_id: int,
+        domain_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> List[Conversation]:
+        result = await db.execute(_user_conversations_query(user_id, domain_id, limit, cursor))
+        return list(result.scalars().all())
+
+    @staticmethod
+    @observe_db("AsyncConversationService.count_user_conversations")
+    async def count_user_conversations(db: AsyncSession, user_id: int, domain_id: Optional[int] = None) -> int:
+        result = await db.execute(_user_conversations_count_query(user_id, domain_id))
+        return result.scalar_one()
+
+    @staticmethod
+    @observe_db("AsyncConversationService.get_conversation_by_id")
+    async def get_conversation_by_id(db: AsyncSession, conversation_id: int, user_id: int) -> Optional[Conversation]:
+        result = await db.execute(
+            select(Conversation).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id == user_id
+            )
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    @observe_db("AsyncConversationService.update_conversation")
+    async def update_conversation(db: AsyncSession, conversation_id: int, user_id: int, update_data: ConversationUpdate) -> Optional[Conversation]:
+        conversation = await AsyncConversationService.get_conversation_by_id(db, conversation_id, user_id)
+        if not conversation:
+            return None
+
+        for field, value in update_data.dict(exclude_unset=True).items():
+            setattr(conversation, field, value)
+            if field == "title":
+                # A title the user chose is never replaced by a generated one
+                conversation.needs_title = False
+
+        await db.commit()
+        await db.refresh(conversation)
+        return conversation
+
+    @staticmethod
+    @observe_db("AsyncConversationService.delete_conversation")
+    async def delete_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> bool:
+        conversation = await AsyncConversationService.get_conversation_by_id(db, conversation_id, user_id)
+        if not conversation:
+            return False
+
+        await db.delete(conversation)
+        await db.commit()
+        return True
+
+    @staticmethod
+    @observe_db("AsyncConversationService.set_generated_titles")
+    async def set_generated_titles(db: AsyncSession, titles: Dict[int, str]) -> None:
+        """
+        Write generated titles (conversation id -> title) in one executemany UPDATE.
+
+        Only rows still flagged needs_title are touched, so a conversation the
+        user renamed in the meantime keeps its name, and updated_at is kept as
+        is so a background title doesn't reorder the conversation list.
+        """
+        if not titles:
+            return
+        table = Conversation.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("conversation_id"))
+            .where(table.c.needs_title.is_(True))
+            .values(title=bindparam("new_title"), needs_title=False, updated_at=table.c.updated_at)
+        )
+        await db.execute(statement, [
+            {"conversation_id": conversation_id, "new_title": title}
+            for conversation_id, title in titles.items()
+        ])
+        await db.commit()
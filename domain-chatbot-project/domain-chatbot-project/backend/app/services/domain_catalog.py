@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Mapping, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.domain import Domain
+from app.schemas.domain import Domain as DomainSchema
+
+
+@dataclass(frozen=True)
+class DomainCatalogSnapshot:
+    """Immutable view of every domain, indexed by id and by name"""
+    domains: tuple
+    by_id: Mapping[int, DomainSchema]
+    by_name: Mapping[str, DomainSchema]
+    etag: str
+
+    @classmethod
+    def build(cls, domains: List[Domain]) -> "DomainCatalogSnapshot":
+        schemas = tuple(sorted((DomainSchema.from_orm(d) for d in domains), key=lambda d: d.id))
+        payload = json.dumps([d.model_dump() for d in schemas], sort_keys=True)
+        return cls(
+            domains=schemas,
+            by_id=MappingProxyType({d.id: d for d in schemas}),
+            by_name=MappingProxyType({d.name: d for d in schemas}),
+            etag=f'"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"',
+        )
+
+
+class DomainCatalog:
+    """
+    In-process cache of the (tiny, rarely changing) domains table.
+
+    Loaded at startup and swapped atomically on reload, so readers always see
+    a complete snapshot. If it hasn't been loaded yet, the first reader loads
+    it with the session it was given.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[DomainCatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> DomainCatalogSnapshot:
+        snapshot = DomainCatalogSnapshot.build(db.query(Domain).all())
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def aload(self, db: AsyncSession) -> DomainCatalogSnapshot:
+        result = await db.execute(select(Domain))
+        snapshot = DomainCatalogSnapshot.build(list(result.scalars().all()))
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get(self, db: Session) -> DomainCatalogSnapshot:
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None else self.load(db)
+
+    async def aget(self, db: AsyncSession) -> DomainCatalogSnapshot:
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None else await self.aload(db)
+
+
+# Create singleton instance
+domain_catalog = DomainCatalog()
@@ -1,20 +1,24 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.domain import Domain
-from app.schemas.domain import DomainCreate
+from app.schemas.domain import Domain as DomainSchema, DomainCreate
+from app.services.domain_catalog import domain_catalog
 from typing import List, Optional
 
+# Reads are served from the in-process domain catalog; only create_domain touches the table.
+
 class DomainService:
     @staticmethod
-    def get_all_domains(db: Session) -> List[Domain]:
-        return db.query(Domain).all()
+    def get_all_domains(db: Session) -> List[DomainSchema]:
+        return list(domain_catalog.get(db).domains)
     
     @staticmethod
-    def get_domain_by_id(db: Session, domain_id: int) -> Optional[Domain]:
-        return db.query(Domain).filter(Domain.id == domain_id).first()
+    def get_domain_by_id(db: Session, domain_id: int) -> Optional[DomainSchema]:
+        return domain_catalog.get(db).by_id.get(domain_id)
     
     @staticmethod
-    def get_domain_by_name(db: Session, name: str) -> Optional[Domain]:
-        return db.query(Domain).filter(Domain.name == name).first()
+    def get_domain_by_name(db: Session, name: str) -> Optional[DomainSchema]:
+        return domain_catalog.get(db).by_name.get(name)
     
     @staticmethod
     def create_domain(db: Session, domain: DomainCreate) -> Domain:
@@ -22,4 +26,31 @@ class DomainService:
         db.add(db_domain)
         db.commit()
         db.refresh(db_domain)
-        return db_domain
\ No newline at end of file
+        # Swap in a fresh catalog snapshot that includes the new domain
+        domain_catalog.load(db)
+        return db_domain
+
+
+class AsyncDomainService:
+    """Async counterpart of DomainService for routes running on the event loop"""
+
+    @staticmethod
+    async def get_all_domains(db: AsyncSession) -> List[DomainSchema]:
+        return list((await domain_catalog.aget(db)).domains)
+
+    @staticmethod
+    async def get_domain_by_id(db: AsyncSession, domain_id: int) -> Optional[DomainSchema]:
+        return (await domain_catalog.aget(db)).by_id.get(domain_id)
+
+    @staticmethod
+    async def get_domain_by_name(db: AsyncSession, name: str) -> Optional[DomainSchema]:
+        return (await domain_catalog.aget(db)).by_name.get(name)
+
+    @staticmethod
+    async def create_domain(db: AsyncSession, domain: DomainCreate) -> Domain:
+        db_domain = Domain(**domain.dict())
+        db.add(db_domain)
+        await db.commit()
+        await db.refresh(db_domain)
+        await domain_catalog.aload(db)
+        return db_domain
@@ -0,0 +1,304 @@
+import asyncio
+import time
+import urllib.parse
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+import httpx
+
+from app.ai.admission import pollinations_admission
+from app.config import settings
+from app.services.image_store import image_store
+from app.utils.metrics import IMAGE_GENERATION_SECONDS
+
+
+class ImageTooLarge(Exception):
+    """The upstream image exceeded settings.image_max_bytes"""
+
+
+@dataclass
+class ImageJob:
+    """A background image generation request"""
+    id: str
+    prompt: str
+    status: str = "pending"  # "pending", "done" or "failed"
+    image_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    task: Optional[asyncio.Task] = None
+
+
+class ImageService:
+    """
+    Async Pollinations client.
+
+    Downloads go through one pooled httpx.AsyncClient and the Pollinations
+    admission controller, so image requests never block the event loop and
+    are shed quickly when the service is saturated. Images are kept in the
+    content-addressed image store, so a repeated prompt is served from disk
+    without calling Pollinations. The seed is derived from the store key, so
+    an image evicted from the store comes back the same when regenerated.
+    Downloads are streamed to a temp file in
+    fixed-size chunks and renamed into place, so memory use doesn't grow with
+    image size, and anything over image_max_bytes is abandoned.
+    """
+
+    pollinations_params = {
+        'width': 512,
+        'height': 512,
+        'model': 'flux',
+        'enhance': 'true'
+    }
+
+    def __init__(self):
+        self.pollinations_base_url = "https://image.pollinations.ai/prompt"
+        self.max_jobs = 1000
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # Jobs started by this process, keyed by image store key
+        self.jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+        self._restoring: Dict[str, asyncio.Task] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared HTTP client on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.image_timeout_seconds, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.image_max_concurrency,
+                    max_keepalive_connections=settings.image_max_concurrency,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def image_key(self, enhanced_prompt: str) -> str:
+        return image_store.key_for(enhanced_prompt, self.pollinations_params)
+
+    def _build_pollinations_url(self, enhanced_prompt: str, key: str) -> str:
+        encoded_prompt = urllib.parse.quote(enhanced_prompt)
+        # Seed fixed per key, so regenerating an evicted image reproduces it
+        params = {**self.pollinations_params, 'seed': int(key[:8], 16)}
+        param_string = '&'.join([f"{k}={v}" for k, v in params.items()])
+        return f"{self.pollinations_base_url}/{encoded_prompt}?{param_string}"
+
+    async def generate_image(self, enhanced_prompt: str) -> Optional[str]:
+        """Download an image for the prompt and return its public URL, or None on failure"""
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            key = self.image_key(enhanced_prompt)
+            filename = await anyio.to_thread.run_sync(image_store.get, key)
+            if filename is not None:
+                outcome = "cache_hit"
+                return self.public_url(filename)
+
+            filename = await self._download_to_store(key, enhanced_prompt)
+            outcome = "success"
+            return self.public_url(filename)
+        except Exception as e:
+            print(f"Pollinations image generation error: {e}")
+            return None
+        finally:
+            IMAGE_GENERATION_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started_at)
+
+    @staticmethod
+    def public_url(filename: str) -> str:
+        return f"{settings.public_base_url}/static/generated_images/{filename}"
+
+    async def restore_image(self, filename: str) -> bool:
+        """Generate an image whose URL went out before it was stored; False if it can't be (unknown key or failure)"""
+        key = filename[:-len(".png")] if filename.endswith(".png") else ""
+        meta = await anyio.to_thread.run_sync(image_store.get_meta, key)
+        if meta is None:
+            return False
+        # Requests for the same missing image share one download
+        task = self._restoring.get(key)
+        if task is None:
+            task = self._restoring[key] = asyncio.create_task(self._restore(key, meta["prompt"]))
+            task.add_done_callback(lambda _: self._restoring.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _restore(self, key: str, enhanced_prompt: str) -> bool:
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            await self._download_to_store(key, enhanced_prompt)
+            outcome = "restored"
+            return True
+        except Exception as e:
+            print(f"Pollinations image restore error for {key}: {e}")
+            return False
+        finally:
+            IMAGE_GENERATION_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started_at)
+
+    @asynccontextmanager
+    async def _open_upstream(self, enhanced_prompt: str, key: str):
+        """Open a streaming Pollinations response, holding an admission slot until it is closed"""
+        async with pollinations_admission.aslot():
+            url = self._build_pollinations_url(enhanced_prompt, key)
+            async with self._get_client().stream("GET", url) as response:
+                response.raise_for_status()
+                declared = response.headers.get("content-length", "")
+                if declared.isdigit() and int(declared) > settings.image_max_bytes:
+                    raise ImageTooLarge(f"Image is {declared} bytes, limit is {settings.image_max_bytes}")
+                yield response
+
+    @staticmethod
+    async def _iter_capped(response: httpx.Response) -> AsyncIterator[bytes]:
+        """Body chunks, failing as soon as the running total passes the size cap"""
+        received = 0
+        async for chunk in response.aiter_bytes(settings.image_download_chunk_bytes):
+            received += len(chunk)
+            if received > settings.image_max_bytes:
+                raise ImageTooLarge(f"Image exceeded {settings.image_max_bytes} bytes")
+            yield chunk
+
+    async def _download_to_store(self, key: str, enhanced_prompt: str) -> str:
+        """Stream the image into a temp file and commit it to the store; returns the filename"""
+        temp_path = await anyio.to_thread.run_sync(image_store.temp_path, key)
+        size = 0
+        try:
+            async with self._open_upstream(enhanced_prompt, key) as response:
+                async with await anyio.open_file(temp_path, "wb") as f:
+                    async for chunk in self._iter_capped(response):
+                        await f.write(chunk)
+                        size += len(chunk)
+        except BaseException:
+            await anyio.to_thread.run_sync(image_store.discard, temp_path)
+            raise
+        await anyio.to_thread.run_sync(image_store.save_meta, key, enhanced_prompt, self.pollinations_params)
+        return await anyio.to_thread.run_sync(image_store.commit, key, temp_path, size)
+
+    # Pass-through mode ------------------------------------------------------
+
+    async def passthrough_url(self, enhanced_prompt: str) -> str:
+        """
+        URL that proxies the image to the client as it downloads (and stores it).
+
+        The prompt is recorded in the image store rather than in this process,
+        so the URL works whichever worker the request lands on.
+        """
+        key = self.image_key(enhanced_prompt)
+        await anyio.to_thread.run_sync(image_store.save_meta, key, enhanced_prompt, self.pollinations_params)
+        return f"{settings.public_base_url}/api/images/live/{key}"
+
+    async def get_stored_prompt(self, key: str) -> Optional[str]:
+        """Prompt recorded in the image store for key, or None if it was never handed out"""
+        meta = await anyio.to_thread.run_sync(image_store.get_meta, key)
+        return meta["prompt"] if meta is not None else None
+
+    async def open_passthrough(self, key: str, enhanced_prompt: str) -> Tuple[str, AsyncIterator[bytes]]:
+        """
+        Start the upstream download and return (content type, body chunks).
+
+        Upstream errors surface here, before any bytes are sent. The chunks are
+        tee'd into a temp file that is committed to the store only if the whole
+        image arrives within the size cap; a client disconnect or an oversized
+        image discards it.
+        """
+        stack = AsyncExitStack()
+        try:
+            response = await stack.enter_async_context(self._open_upstream(enhanced_prompt, key))
+        except BaseException:
+            await stack.aclose()
+            raise
+        temp_path = await anyio.to_thread.run_sync(image_store.temp_path, key)
+
+        async def body() -> AsyncIterator[bytes]:
+            started_at = time.perf_counter()
+            outcome = "error"
+            size = 0
+            try:
+                async with await anyio.open_file(temp_path, "wb") as f:
+                    async for chunk in self._iter_capped(response):
+                        await f.write(chunk)
+                        size += len(chunk)
+                        yield chunk
+                await anyio.to_thread.run_sync(image_store.commit, key, temp_path, size)
+                outcome = "success"
+            except ImageTooLarge as e:
+                # Headers are already sent; cutting the body short is all we can do
+                print(f"Pass-through image aborted: {e}")
+            finally:
+                if outcome != "success":
+                    await anyio.to_thread.run_sync(image_store.discard, temp_path)
+                await stack.aclose()
+                IMAGE_GENERATION_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started_at)
+
+        return response.headers.get("content-type", "image/png"), body()
+
+    # Job mode ---------------------------------------------------------------
+
+    async def submit_job(self, enhanced_prompt: str) -> ImageJob:
+        """
+        Start generating in the background and return the job immediately.
+
+        The job id is the image store key and the prompt is recorded in the
+        store, so any worker process can answer for the job.
+        """
+        key = self.image_key(enhanced_prompt)
+        await anyio.to_thread.run_sync(image_store.save_meta, key, enhanced_prompt, self.pollinations_params)
+        job = self.jobs.get(key)
+        if job is None or job.status == "failed":
+            job = self._start_job(key, enhanced_prompt)
+        return job
+
+    def _start_job(self, key: str, enhanced_prompt: str) -> ImageJob:
+        job = ImageJob(id=key, prompt=enhanced_prompt)
+        job.task = asyncio.create_task(self._run_job(job))
+        self.jobs[key] = job
+        self.jobs.move_to_end(key)
+        self._prune_jobs()
+        return job
+
+    async def _run_job(self, job: ImageJob):
+        image_url = await self.generate_image(job.prompt)
+        if image_url:
+            job.status = "done"
+            job.image_url = image_url
+        else:
+            job.status = "failed"
+            job.error = "Image service unavailable"
+
+    def _prune_jobs(self):
+        """Drop the oldest finished jobs once the registry is full"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].status != "pending":
+                del self.jobs[job_id]
+
+    async def get_job(self, job_id: str) -> Optional[ImageJob]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        # Submitted through another worker process: pick it up from the image
+        # store (a cache hit if that worker has already finished it)
+        prompt = await self.get_stored_prompt(job_id)
+        return self._start_job(job_id, prompt) if prompt is not None else None
+
+    async def wait_for_job(self, job: ImageJob, timeout: float) -> ImageJob:
+        """Wait (bounded) for a pending job to finish"""
+        if job.status == "pending" and job.task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(job.task), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def job_image_url(self, job_id: str) -> str:
+        """Placeholder URL that serves the image once the job finishes"""
+        return f"{settings.public_base_url}/api/images/jobs/{job_id}/image"
+
+
+# Create singleton
+image_service = ImageService()
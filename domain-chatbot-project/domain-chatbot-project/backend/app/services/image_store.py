@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.config import settings
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ImageStore:
+    """
+    Content-addressed store for generated images, bounded by a disk budget.
+
+    Files are named by a hash of the enhanced prompt and generation parameters,
+    so a repeated prompt is served from disk and a file's contents never change
+    under its name (which is what makes immutable cache headers safe). Reads
+    refresh a file's mtime; when the images grow past max_bytes the least
+    recently used ones are deleted.
+
+    Only finished images go in directory, which is served publicly. Each key's
+    prompt and parameters are kept in a {key}.json sidecar in state_directory,
+    next to partial downloads, so a URL handed out before its image exists can
+    be generated by whichever worker gets the request. A sidecar counts toward
+    the budget and is deleted with its image; sidecars that never got an image
+    and temp files left by an interrupted download are swept after
+    stale_seconds. Images saved before the store existed have other names, so
+    they are left out of the index and never evicted.
+
+    Every worker process shares the directories, so the in-memory index is only
+    this process's view: a lookup that misses it checks the disk, and the
+    directories are rescanned every rescan_seconds and before evicting, so
+    images written by other workers count toward the budget too.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        state_directory: str,
+        max_bytes: int,
+        rescan_seconds: float = 60.0,
+        stale_seconds: float = 24 * 3600,
+    ):
+        self.directory = directory
+        self.state_directory = state_directory
+        self.max_bytes = max_bytes
+        self.rescan_seconds = rescan_seconds
+        self.stale_seconds = stale_seconds
+        self._index: Optional["OrderedDict[str, int]"] = None  # filename -> size, LRU first
+        self._total_bytes = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(prompt: str, params: Dict) -> str:
+        payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def filename_for(key: str) -> str:
+        return f"{key}.png"
+
+    @staticmethod
+    def is_key(value: str) -> bool:
+        return bool(_KEY_PATTERN.match(value))
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.state_directory, f"{key}.json")
+
+    def _image_size(self, filename: str) -> int:
+        try:
+            return os.stat(os.path.join(self.directory, filename)).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _meta_size(self, key: str) -> int:
+        try:
+            return os.stat(self._meta_path(key)).st_size
+        except FileNotFoundError:
+            return 0
+
+    def save_meta(self, key: str, prompt: str, params: Dict):
+        """Record what key was generated from (once), so it can be regenerated after eviction"""
+        path = self._meta_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.state_directory, exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"prompt": prompt, "params": params}, f)
+        os.replace(temp_path, path)
+
+    def get_meta(self, key: str) -> Optional[Dict]:
+        """Prompt and parameters key was generated from, or None if unknown"""
+        if not self.is_key(key):
+            return None
+        try:
+            with open(self._meta_path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _load_index(self):
+        """Scan the directories on first use and every rescan_seconds after (caller holds the lock)"""
+        if self._index is None or time.monotonic() - self._scanned_at >= self.rescan_seconds:
+            self._scan()
+
+    def _scan(self):
+        """Rebuild the index from disk, oldest mtime first, sweeping stale leftovers (caller holds the lock)"""
+        os.makedirs(self.directory, exist_ok=True)
+        os.makedirs(self.state_directory, exist_ok=True)
+        stale_before = time.time() - self.stale_seconds
+        sidecars = {}
+        for entry in os.scandir(self.state_directory):
+            stat = self._stat(entry)
+            if stat is None:
+                continue
+            if entry.name.endswith(".json"):
+                sidecars[entry.name[:-len(".json")]] = stat
+            elif entry.name.endswith(".tmp") and stat.st_mtime < stale_before:
+                self.discard(entry.path)
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            key = entry.name[:-len(".png")]
+            if not (entry.name.endswith(".png") and self.is_key(key)):
+                continue
+            stat = self._stat(entry)
+            if stat is None:
+                continue
+            sidecar = sidecars.pop(key, None)
+            entries.append((stat.st_mtime, entry.name, stat.st_size + (sidecar.st_size if sidecar else 0)))
+        for key, stat in sidecars.items():
+            if stat.st_mtime < stale_before:
+                # Handed out but never downloaded
+                self.discard(self._meta_path(key))
+
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self._total_bytes = sum(self._index.values())
+        self._scanned_at = time.monotonic()
+
+    @staticmethod
+    def _stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+        """Stat of a regular file, or None if it is gone or not a file"""
+        try:
+            return entry.stat() if entry.is_file() else None
+        except FileNotFoundError:
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Filename of the stored image for key, or None; marks it recently used"""
+        filename = self.filename_for(key)
+        with self._lock:
+            self._load_index()
+            try:
+                os.utime(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                # Not stored, or evicted by another worker
+                self._total_bytes -= self._index.pop(filename, 0)
+                return None
+            if filename not in self._index:
+                # Stored by another worker since the last scan
+                size = self._image_size(filename) + self._meta_size(key)
+                self._index[filename] = size
+                self._total_bytes += size
+            self._index.move_to_end(filename)
+            return filename
+
+    def temp_path(self, key: str) -> str:
+        """Unique temp file in the state directory for writing key's image before commit"""
+        with self._lock:
+            self._load_index()
+        return os.path.join(self.state_directory, f"{self.filename_for(key)}.{uuid.uuid4().hex[:8]}.tmp")
+
+    def commit(self, key: str, temp_path: str, size: int) -> str:
+        """Atomically move a fully written temp file into place and evict over-budget files"""
+        filename = self.filename_for(key)
+        os.replace(temp_path, os.path.join(self.directory, filename))
+        size += self._meta_size(key)
+        with self._lock:
+            self._load_index()
+            self._total_bytes -= self._index.pop(filename, 0)
+            self._index[filename] = size
+            self._total_bytes += size
+            if 0 < self.max_bytes < self._total_bytes:
+                # Other workers' writes and evictions only show up in a scan
+                self._scan()
+                self._evict(keep=filename)
+        return filename
+
+    @staticmethod
+    def discard(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: str):
+        """Delete least recently used files until under budget (caller holds the lock)"""
+        if self.max_bytes <= 0:
+            return
+        for filename in list(self._index):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if filename == keep:
+                continue
+            self.discard(os.path.join(self.directory, filename))
+            self.discard(self._meta_path(filename[:-len(".png")]))
+            self._total_bytes -= self._index.pop(filename)
+
+
+# Create singleton instance
+image_store = ImageStore(
+    directory=os.path.join("static", "generated_images"),
+    state_directory=settings.image_store_state_dir,
+    max_bytes=settings.image_cache_max_bytes,
+    rescan_seconds=settings.image_cache_rescan_seconds,
+)
@@ -1,36 +1,113 @@
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.message import Message
 from app.models.conversation import Conversation
 from app.schemas.message import MessageCreate
+from app.utils.metrics import observe_db
 from typing import List, Optional
 
+
+def _history_query(conversation_id: int, limit: Optional[int] = None, before_id: Optional[int] = None):
+    """
+    Keyset-paginated message query served by ix_messages_conversation_id_created_at.
+
+    With `limit`, returns the newest `limit` messages (strictly older than
+    message `before_id` when given) in newest-first order; otherwise all
+    matching messages oldest-first.
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if before_id is not None:
+        anchor_created_at = (
+            select(Message.created_at)
+            .where(Message.id == before_id, Message.conversation_id == conversation_id)
+            .scalar_subquery()
+        )
+        # (created_at, id) breaks ties between messages written in the same transaction
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(anchor_created_at, before_id))
+    if limit:
+        return query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    return query.order_by(Message.created_at.asc(), Message.id.asc())
+
 class MessageService:
     @staticmethod
+    @observe_db("MessageService.create_message")
     def create_message(db: Session, message: MessageCreate) -> Message:
-        db_message = Message(**message.dict())
-        db.add(db_message)
+        # INSERT ... RETURNING gives us id/created_at without a refresh SELECT,
+        # and the conversation bump rides in the same transaction
+        db_message = db.execute(
+            insert(Message).values(**message.dict()).returning(Message)
+        ).scalar_one()
+        db.execute(
+            update(Conversation)
+            .where(Conversation.id == message.conversation_id)
+            .values(updated_at=func.now())
+        )
+        # Detach so commit doesn't expire the loaded attributes
+        db.expunge(db_message)
         db.commit()
-        db.refresh(db_message)
-        
-        # Update conversation's updated_at timestamp
-        conversation = db.query(Conversation).filter(Conversation.id == message.conversation_id).first()
-        if conversation:
-            conversation.updated_at = db_message.created_at
-            db.commit()
-        
         return db_message
     
     @staticmethod
-    def get_conversation_messages(db: Session, conversation_id: int) -> List[Message]:
-        return db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.asc()).all()
+    @observe_db("MessageService.get_conversation_messages")
+    def get_conversation_messages(
+        db: Session, conversation_id: int, limit: Optional[int] = None, before_id: Optional[int] = None
+    ) -> List[Message]:
+        return MessageService.get_conversation_history(db, conversation_id, limit, before_id)
     
     @staticmethod
-    def get_conversation_history(db: Session, conversation_id: int, limit: Optional[int] = None) -> List[Message]:
-        query = db.query(Message).filter(Message.conversation_id == conversation_id)
-        if limit:
-            query = query.order_by(Message.created_at.desc()).limit(limit)
-            messages = query.all()
-            return list(reversed(messages))  # Return in chronological order
-        return query.order_by(Message.created_at.asc()).all()
\ No newline at end of file
+    @observe_db("MessageService.get_conversation_history")
+    def get_conversation_history(
+        db: Session, conversation_id: int, limit: Optional[int] = None, before_id: Optional[int] = None
+    ) -> List[Message]:
+        messages = db.execute(_history_query(conversation_id, limit, before_id)).scalars().all()
+        # Limited pages are read newest-first; return in chronological order
+        return list(reversed(messages)) if limit else list(messages)
+
+class AsyncMessageService:
+    """Async counterpart of MessageService for routes running on the event loop"""
+
+    @staticmethod
+    @observe_db("AsyncMessageService.create_message")
+    async def create_message(db: AsyncSession, message: MessageCreate) -> Message:
+        result = await db.execute(
+            insert(Message).values(**message.dict()).returning(Message)
+        )
+        db_message = result.scalar_one()
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == message.conversation_id)
+            .values(updated_at=func.now())
+        )
+        await db.commit()
+        return db_message
+
+    @staticmethod
+    @observe_db("AsyncMessageService.create_messages")
+    async def create_messages(db: AsyncSession, messages: List[MessageCreate]) -> None:
+        """Insert a batch of messages and bump their conversations in one transaction"""
+        if not messages:
+            return
+        await db.execute(insert(Message), [message.dict() for message in messages])
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id.in_({message.conversation_id for message in messages}))
+            .values(updated_at=func.now())
+        )
+        await db.commit()
+
+    @staticmethod
+    @observe_db("AsyncMessageService.get_conversation_messages")
+    async def get_conversation_messages(
+        db: AsyncSession, conversation_id: int, limit: Optional[int] = None, before_id: Optional[int] = None
+    ) -> List[Message]:
+        return await AsyncMessageService.get_conversation_history(db, conversation_id, limit, before_id)
+
+    @staticmethod
+    @observe_db("AsyncMessageService.get_conversation_history")
+    async def get_conversation_history(
+        db: AsyncSession, conversation_id: int, limit: Optional[int] = None, before_id: Optional[int] = None
+    ) -> List[Message]:
+        result = await db.execute(_history_query(conversation_id, limit, before_id))
+        messages = result.scalars().all()
+        return list(reversed(messages)) if limit else list(messages)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.schemas.message import MessageCreate
+from app.services.message_service import AsyncMessageService
+from app.utils.metrics import MESSAGE_WRITE_FAILURES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# A queued message and the future resolved once it is committed
+_QueuedMessage = Tuple[MessageCreate, asyncio.Future]
+
+
+class MessageWriteFailed(Exception):
+    """A queued message could not be persisted after every retry"""
+
+
+class MessageWriteBehind:
+    """
+    Bounded write-behind queue for assistant messages.
+
+    Streaming endpoints enqueue the finished reply and get back a future that
+    resolves once it is committed; a background worker inserts queued
+    messages in batches. There is no linger: the worker writes whatever is
+    queued right away, and replies arriving during that INSERT form the next
+    batch, so an idle queue adds no latency and a busy one still batches. Failed batches are retried with backoff, and
+    whatever is still queued is flushed on shutdown. If the queue is full (or
+    the worker isn't running) the message is written inline instead. A batch
+    that still fails is written row by row, and only the rows that fail again
+    are logged, counted and surfaced through their futures.
+
+    Readers that need a conversation's latest messages (history reads,
+    summarization) call wait_for_conversation first so they never miss a
+    reply that is still queued.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, max_retries: int):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Batch the worker is currently writing; flushed by stop() if interrupted
+        self._current_batch: List[_QueuedMessage] = []
+        # Uncommitted messages per conversation
+        self._pending: Dict[int, Set[asyncio.Future]] = {}
+
+    def start(self):
+        """Start the background worker (call from the app startup hook)"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker and flush every message still queued"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        remaining, self._current_batch = self._current_batch, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for i in range(0, len(remaining), self.batch_size):
+            await self._write_batch(remaining[i:i + self.batch_size])
+
+    async def enqueue(self, message: MessageCreate) -> asyncio.Future:
+        """Queue a message; the returned future resolves when it is committed (or raises MessageWriteFailed)"""
+        future = asyncio.get_running_loop().create_future()
+        self._track(message.conversation_id, future)
+        if self._worker is not None:
+            try:
+                self._queue.put_nowait((message, future))
+                return future
+            except asyncio.QueueFull:
+                logger.warning("Message write-behind queue full, writing inline")
+        await self._write_batch([(message, future)])
+        return future
+
+    async def wait_for_conversation(self, conversation_id: int):
+        """Wait until every message queued for the conversation has been written (or has failed)"""
+        pending = self._pending.get(conversation_id)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _track(self, conversation_id: int, future: asyncio.Future):
+        pending = self._pending.setdefault(conversation_id, set())
+        pending.add(future)
+
+        def untrack(done: asyncio.Future):
+            pending.discard(done)
+            if not pending and self._pending.get(conversation_id) is pending:
+                del self._pending[conversation_id]
+
+        future.add_done_callback(untrack)
+
+    async def _run(self):
+        while True:
+            batch: List[_QueuedMessage] = [await self._queue.get()]
+            self._current_batch = batch
+            # Take whatever else is already queued; don't wait for more
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._write_batch(batch)
+            self._current_batch = []
+
+    async def _write_batch(self, batch: List[_QueuedMessage]):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self._insert([message for message, _ in batch])
+                self._resolve(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Message write-behind error (attempt %d/%d): %s", attempt, self.max_retries, e)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+        if len(batch) == 1:
+            self._fail(batch)
+            return
+        # One bad row (e.g. its conversation was deleted mid-stream) fails the
+        # whole INSERT; write rows one at a time so only that reply is lost
+        for item in batch:
+            try:
+                await self._insert([item[0]])
+                self._resolve([item])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Message write-behind error for conversation %d: %s", item[0].conversation_id, e)
+                self._fail([item])
+
+    @staticmethod
+    async def _insert(messages: List[MessageCreate]):
+        async with AsyncSessionLocal() as db:
+            await AsyncMessageService.create_messages(db, messages)
+
+    @staticmethod
+    def _resolve(items: List[_QueuedMessage]):
+        for _, future in items:
+            if not future.done():
+                future.set_result(None)
+
+    @staticmethod
+    def _fail(items: List[_QueuedMessage]):
+        MESSAGE_WRITE_FAILURES_TOTAL.inc(len(items))
+        conversation_ids = sorted({message.conversation_id for message, _ in items})
+        logger.error(
+            "Message write-behind could not persist %d message(s) for conversation(s) %s",
+            len(items), conversation_ids,
+        )
+        for _, future in items:
+            if not future.done():
+                future.set_exception(MessageWriteFailed("Message could not be saved"))
+
+
+# Create singleton instance
+message_writer = MessageWriteBehind(
+    max_queue_size=settings.message_write_queue_size,
+    batch_size=settings.message_write_batch_size,
+    max_retries=settings.message_write_max_retries,
+)
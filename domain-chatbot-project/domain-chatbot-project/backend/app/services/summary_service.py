@@ -0,0 +1,141 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.ai.llm_registry import llm_registry
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.conversation_summary import ConversationSummary
+from app.models.message import Message
+from app.services.message_writer import message_writer
+from app.utils.metrics import observe_db
+from typing import List, Optional, Set
+
+
+class SummaryService:
+    @staticmethod
+    @observe_db("SummaryService.get_summary")
+    def get_summary(db: Session, conversation_id: int) -> Optional[ConversationSummary]:
+        return db.get(ConversationSummary, conversation_id)
+
+
+class AsyncSummaryService:
+    """Async counterpart of SummaryService for routes running on the event loop"""
+
+    @staticmethod
+    @observe_db("AsyncSummaryService.get_summary")
+    async def get_summary(db: AsyncSession, conversation_id: int) -> Optional[ConversationSummary]:
+        return await db.get(ConversationSummary, conversation_id)
+
+    @staticmethod
+    @observe_db("AsyncSummaryService.get_unsummarized_messages")
+    async def get_unsummarized_messages(db: AsyncSession, conversation_id: int, after_id: int) -> List[Message]:
+        result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id, Message.id > after_id)
+            .order_by(Message.created_at, Message.id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    @observe_db("AsyncSummaryService.save_summary")
+    async def save_summary(
+        db: AsyncSession, existing: Optional[ConversationSummary], conversation_id: int,
+        summary: str, summarized_until_id: int, folded_count: int
+    ) -> ConversationSummary:
+        if existing is None:
+            existing = ConversationSummary(conversation_id=conversation_id, message_count=0)
+            db.add(existing)
+        existing.summary = summary
+        existing.summarized_until_id = summarized_until_id
+        existing.message_count = (existing.message_count or 0) + folded_count
+        await db.commit()
+        return existing
+
+
+class ConversationSummarizer:
+    """
+    Keeps each conversation's rolling summary up to date.
+
+    Run as a background task after a reply is stored. The newest keep_recent
+    messages always stay verbatim; once every_messages older ones are not yet
+    in the summary they are folded into it with one LLM call, so the summary
+    grows by a bounded amount however long the conversation gets.
+    """
+
+    def __init__(self, every_messages: int, keep_recent: int):
+        self.every_messages = every_messages
+        self.keep_recent = keep_recent
+        # Conversations being summarized right now; updates run on the event loop only
+        self._in_progress: Set[int] = set()
+        self._llm = None
+
+    @property
+    def llm(self):
+        """Low-temperature Gemini client for summaries, from the LLM registry"""
+        if self._llm is None:
+            self._llm = llm_registry.get(temperature=0.2)
+        return self._llm
+
+    @property
+    def enabled(self) -> bool:
+        return self.every_messages > 0
+
+    def select_recent(self, summary: Optional[ConversationSummary], history: List[Message]) -> List[Message]:
+        """Drop history messages the summary already covers"""
+        if summary is None:
+            return history
+        return [msg for msg in history if msg.id is None or msg.id > summary.summarized_until_id]
+
+    async def update_if_due(self, conversation_id: int, domain_name: str):
+        if not self.enabled or conversation_id in self._in_progress:
+            return
+        self._in_progress.add(conversation_id)
+        try:
+            # Don't summarize around a reply that is still in the write-behind queue
+            await message_writer.wait_for_conversation(conversation_id)
+            async with AsyncSessionLocal() as db:
+                existing = await AsyncSummaryService.get_summary(db, conversation_id)
+                after_id = existing.summarized_until_id if existing else 0
+                pending = await AsyncSummaryService.get_unsummarized_messages(db, conversation_id, after_id)
+                to_fold = pending[:-self.keep_recent] if self.keep_recent else pending
+                if len(to_fold) < self.every_messages:
+                    return
+
+                summary = await self._summarize(domain_name, existing.summary if existing else "", to_fold)
+                if not summary:
+                    return
+                await AsyncSummaryService.save_summary(
+                    db, existing, conversation_id, summary, to_fold[-1].id, len(to_fold)
+                )
+                print(f"Updated summary for conversation {conversation_id}: folded {len(to_fold)} message(s)")
+        except Exception as e:
+            print(f"Conversation summary error for {conversation_id}: {e}")
+        finally:
+            self._in_progress.discard(conversation_id)
+
+    async def _summarize(self, domain_name: str, previous_summary: str, messages: List[Message]) -> str:
+        from langchain.schema import HumanMessage
+
+        transcript = "\n".join(
+            f"{'User' if msg.role == 'user' else 'Assistant'}: {msg.content}" for msg in messages
+        )
+        prompt = f"""You maintain a running summary of a {domain_name} conversation between a user and an assistant.
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New messages:
+{transcript}
+
+Rewrite the summary so it also covers the new messages. Keep the facts, decisions, open questions and user preferences that later answers may need. Use at most 200 words and no preamble.
+
+Summary:"""
+        response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+        return response.content.strip()
+
+
+# Create singleton instance
+conversation_summarizer = ConversationSummarizer(
+    every_messages=settings.summary_every_messages,
+    keep_recent=settings.summary_keep_recent_messages,
+)
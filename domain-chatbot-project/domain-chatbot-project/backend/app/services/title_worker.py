@@ -0,0 +1,108 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.ai_service import ai_service
+from app.services.conversation_service import AsyncConversationService
+
+
+@dataclass(frozen=True)
+class TitleRequest:
+    conversation_id: int
+    domain_name: str
+    first_message: str
+
+
+class ConversationTitleWorker:
+    """
+    Background worker that titles new conversations in batches.
+
+    Chat routes enqueue conversations still flagged needs_title (not yet
+    titled or renamed). The worker lingers briefly to collect a batch, asks the
+    LLM for all of their titles in one call, and writes them with a single
+    UPDATE, clearing the flag. Titling is
+    best effort: if the queue is full or the worker isn't running, the request
+    is dropped and the conversation is picked up again on its next message.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval: float):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Conversations queued or being titled, so repeat messages don't enqueue them twice
+        self._pending: Set[int] = set()
+
+    def start(self):
+        """Start the background worker (call from the app startup hook)"""
+        if self._worker is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; untitled conversations are retried on their next message"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._pending.clear()
+
+    def enqueue(self, request: TitleRequest):
+        """Queue a conversation for titling; safe to call from the event loop or a threadpool route"""
+        if self._worker is not None:
+            self._loop.call_soon_threadsafe(self._put, request)
+
+    def _put(self, request: TitleRequest):
+        if request.conversation_id in self._pending:
+            return
+        try:
+            self._queue.put_nowait(request)
+            self._pending.add(request.conversation_id)
+        except asyncio.QueueFull:
+            print(f"Title queue full, skipping conversation {request.conversation_id}")
+
+    async def _run(self):
+        while True:
+            batch: List[TitleRequest] = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._title_batch(batch)
+            except Exception as e:
+                print(f"Title worker error for {len(batch)} conversation(s): {e}")
+            finally:
+                for request in batch:
+                    self._pending.discard(request.conversation_id)
+
+    async def _title_batch(self, batch: List[TitleRequest]):
+        titles = await ai_service.generate_conversation_titles(
+            [(request.conversation_id, request.domain_name, request.first_message) for request in batch]
+        )
+        async with AsyncSessionLocal() as db:
+            await AsyncConversationService.set_generated_titles(db, titles)
+        print(f"Titled {len(titles)} conversation(s)")
+
+
+# Create singleton instance
+title_worker = ConversationTitleWorker(
+    max_queue_size=settings.title_queue_size,
+    batch_size=settings.title_batch_size,
+    flush_interval=settings.title_flush_interval,
+)
@@ -1,6 +1,14 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
@@ -8,12 +16,121 @@ from app.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as seen by route handlers.
+
+    A plain snapshot instead of an ORM object, so it can be cached across
+    requests and sessions safely.
+    """
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            created_at=user.created_at,
+        )
+
+    def to_claims(self) -> dict:
+        """Claims embedded in tokens when AUTH_CLAIMS_ONLY is enabled"""
+        return {
+            "email": self.email,
+            "username": self.username,
+            "full_name": self.full_name,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        """Rebuild a principal from token claims; None if the token doesn't carry them"""
+        try:
+            return cls(
+                id=int(payload["sub"]),
+                email=payload["email"],
+                username=payload["username"],
+                full_name=payload.get("full_name"),
+                created_at=datetime.fromisoformat(payload["created_at"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+class PrincipalCache:
+    """
+    Short-lived LRU cache of resolved principals keyed by bearer token.
+
+    Entries expire after the configured TTL or when the token itself expires,
+    whichever comes first, and are dropped when the user row changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def set(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (expires_at, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in [t for t, (_, p) in self._entries.items() if p.id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+)
+
+# Drop cached principals whenever a user row is updated or deleted through the ORM
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Cache hits skip both JWT decoding and the database (entries never outlive the token)
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: str = payload.get("sub")
@@ -21,7 +138,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).get(int(user_id))
-    if user is None:
-        raise credentials_exception
-    return user
+
+    principal = Principal.from_claims(payload) if settings.auth_claims_only else None
+    if principal is None:
+        user = db.get(User, int(user_id))
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+
+    principal_cache.set(token, principal, token_expires_at=payload.get("exp"))
+    return principal
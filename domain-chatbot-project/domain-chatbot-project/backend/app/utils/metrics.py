@@ -0,0 +1,125 @@
+"""
+Prometheus metrics for the chat pipeline, served at /metrics.
+
+Metrics are per worker process (no multiprocess aggregation).
+"""
+import functools
+import inspect
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# LLM stages take seconds, DB calls milliseconds
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+ROUTER_STAGE_SECONDS = Histogram(
+    "domain_router_stage_seconds",
+    "Wall time of each DomainRouter pipeline stage",
+    ["stage", "mode"],
+    buckets=LLM_BUCKETS,
+)
+STREAM_TTFT_SECONDS = Histogram(
+    "chat_stream_time_to_first_token_seconds",
+    "Time from stream start to the first model token",
+    ["domain"],
+    buckets=LLM_BUCKETS,
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    "chat_stream_tokens_per_second",
+    "Estimated output tokens per second after the first token (4 chars per token)",
+    ["domain"],
+    buckets=(5, 10, 20, 40, 80, 160, 320, 640),
+)
+IMAGE_GENERATION_SECONDS = Histogram(
+    "image_generation_seconds",
+    "Time to serve a generated image (outcome: success, cache_hit, restored, error)",
+    ["outcome"],
+    buckets=LLM_BUCKETS,
+)
+URL_FETCH_SECONDS = Histogram(
+    "url_fetch_seconds",
+    "Time to fetch user-supplied URL content",
+    ["outcome"],
+    buckets=LLM_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_service_call_seconds",
+    "Database time per service method",
+    ["method"],
+    buckets=DB_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+    buckets=DB_BUCKETS,
+)
+FALLBACK_RESPONSES_TOTAL = Counter(
+    "ai_fallback_responses_total",
+    "Canned fallback replies returned instead of a model answer",
+    ["domain", "source"],
+)
+CONTEXT_TOKENS_SAVED_TOTAL = Counter(
+    "context_tokens_saved_total",
+    "Estimated prompt tokens the context assembler left out versus sending full history",
+    ["domain"],
+)
+MESSAGE_WRITE_FAILURES_TOTAL = Counter(
+    "message_write_behind_failures_total",
+    "Queued messages that could not be persisted after every retry",
+)
+UPSTREAM_QUEUE_DEPTH = Gauge(
+    "upstream_queue_depth",
+    "Callers waiting for an upstream admission slot",
+    ["provider"],
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "upstream_inflight",
+    "Upstream calls currently admitted",
+    ["provider"],
+)
+UPSTREAM_REJECTIONS_TOTAL = Counter(
+    "upstream_rejections_total",
+    "Upstream calls shed by admission control",
+    ["provider", "reason"],
+)
+SINGLE_FLIGHT_REQUESTS_TOTAL = Counter(
+    "single_flight_requests_total",
+    "Coalescable LLM requests by whether they led an upstream call or joined one",
+    ["kind", "role"],
+)
+SINGLE_FLIGHT_COALESCING_RATIO = Gauge(
+    "single_flight_coalescing_ratio",
+    "Share of coalescable LLM requests served by another request's upstream call",
+    ["kind"],
+)
+
+def observe_db(method: str):
+    """Decorator recording a service method's duration in DB_QUERY_SECONDS (sync or async)"""
+    histogram = DB_QUERY_SECONDS.labels(method=method)
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started_at = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started_at)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started_at)
+        return wrapper
+    return decorate
+
+def render_metrics():
+    """Latest metrics in the Prometheus text exposition format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
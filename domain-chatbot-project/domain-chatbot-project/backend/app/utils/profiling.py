@@ -0,0 +1,106 @@
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import anyio
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_OUTPUT_HEADER = b"x-profile-output"
+
+
+class StackSampler:
+    """
+    Background thread that samples every thread's Python stack at a fixed interval.
+
+    Samples are aggregated as collapsed stacks ("thread;outer;...;inner count"),
+    the input format of flamegraph.pl and speedscope. Work running in the
+    threadpool is captured too, so sync routes and AIService calls show up; other
+    requests in flight at the same time will also appear in the samples.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests carrying "X-Profile: <token>".
+
+    The collapsed-stack file is written to output_dir once the response body has
+    been fully sent (so streamed replies are covered end to end), and its file
+    name (relative to output_dir) is returned in the X-Profile-Output response
+    header. Requests without a matching header are passed straight through.
+    """
+
+    def __init__(self, app, token: str, output_dir: str, interval: float):
+        self.app = app
+        self.token = token.encode()
+        self.output_dir = output_dir
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        supplied = next((value for name, value in scope["headers"] if name == PROFILE_HEADER), None)
+        if supplied is None or not hmac.compare_digest(supplied, self.token):
+            await self.app(scope, receive, send)
+            return
+
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{slug}_{uuid.uuid4().hex[:8]}.folded"
+        path = os.path.join(self.output_dir, filename)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_OUTPUT_HEADER, filename.encode())]
+            await send(message)
+
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            sampler.stop()
+            os.makedirs(self.output_dir, exist_ok=True)
+            await anyio.to_thread.run_sync(sampler.write_collapsed, path)
+            print(
+                f"Profiled {scope['method']} {scope['path']} in {time.perf_counter() - started_at:.3f}s: "
+                f"{sum(sampler.samples.values())} samples -> {path}"
+            )
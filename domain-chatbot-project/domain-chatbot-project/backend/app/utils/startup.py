@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+class StartupReport:
+    """Records how long each startup phase took"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def as_dict(self) -> dict:
+        return {
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "total_ms": round(sum(self.phases.values()) * 1000, 1),
+        }
+
+    def print_report(self):
+        print("Startup time by phase:")
+        for name, seconds in self.phases.items():
+            print(f"  {name:<20} {seconds * 1000:8.1f} ms")
+        print(f"  {'total':<20} {sum(self.phases.values()) * 1000:8.1f} ms")
+
+startup_report = StartupReport()
@@ -0,0 +1,35 @@
+from typing import Awaitable, Callable, Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for content-addressed files.
+
+    A file's name changes whenever its content does, so browsers and CDNs may
+    cache responses for a year without revalidating. If on_missing is given it
+    is awaited with the requested path when a file isn't found; returning True
+    means the file has been recreated and it is served after all.
+    """
+
+    cache_control = "public, max-age=31536000, immutable"
+
+    def __init__(self, *args, on_missing: Optional[Callable[[str], Awaitable[bool]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_missing = on_missing
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or self.on_missing is None or not await self.on_missing(path):
+                raise
+        return await super().get_response(path, scope)
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = self.cache_control
+        return response
@@ -0,0 +1,58 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph:
+    """
+    Tiny dependency-aware async executor.
+
+    Each step names the steps it depends on and receives their results as
+    keyword arguments. A step starts as soon as its own dependencies are
+    done, so independent branches run concurrently and the total time is
+    roughly the longest branch. Sync steps run in a worker thread. If any
+    step fails, the steps still running are cancelled and the error is raised.
+    """
+
+    def __init__(self, name: str = "graph"):
+        self.name = name
+        self._steps: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, fn: Callable, *depends_on: str) -> "TaskGraph":
+        for dependency in depends_on:
+            if dependency not in self._steps:
+                raise ValueError(f"Step '{name}' depends on unknown step '{dependency}'")
+        self._steps[name] = (fn, depends_on)
+        return self
+
+    async def _run_step(self, name: str, tasks: Dict[str, asyncio.Task]) -> Any:
+        fn, depends_on = self._steps[name]
+        kwargs = {dependency: await tasks[dependency] for dependency in depends_on}
+        started_at = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                return await fn(**kwargs)
+            return await asyncio.to_thread(fn, **kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - started_at
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every step and return their results by name"""
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self._steps:
+            tasks[name] = asyncio.ensure_future(self._run_step(name, tasks))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        if logger.isEnabledFor(logging.DEBUG):
+            timings = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.timings.items())
+            logger.debug("TaskGraph %s: %s", self.name, timings)
+        return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,101 @@
+"""
+Run the offline benchmark suite or compare two result files.
+
+Usage (from the backend directory):
+    python -m benchmarks run --output benchmarks/baselines/baseline.json
+    python -m benchmarks run --output current.json --compare benchmarks/baselines/baseline.json
+    python -m benchmarks compare benchmarks/baselines/baseline.json current.json --threshold 0.15
+
+`compare` exits with status 1 when any benchmark's median regressed by more
+than the threshold, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+def run(args) -> int:
+    from benchmarks.suite import BENCHMARKS, run_benchmark
+
+    names = args.only or sorted(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        return 2
+
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(BENCHMARKS[name](), min_time=args.min_time)
+        print(f"{name:<45} median {results[name]['median_us']:>12.1f} us  p95 {results[name]['p95_us']:>12.1f} us")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            return compare_reports(json.load(f), report, args.threshold)
+    return 0
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> int:
+    regressions = 0
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<45} new (no baseline)")
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  improved"
+        print(f"{name:<45} {base['median_us']:>12.1f} -> {result['median_us']:>12.1f} us  ({ratio:.2f}x){flag}")
+    for name in sorted(set(baseline["results"]) - set(current["results"])):
+        print(f"{name:<45} missing from current run")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return 1 if regressions else 0
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, args.threshold)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the suite")
+    run_parser.add_argument("--output", help="write results JSON here")
+    run_parser.add_argument("--compare", help="baseline JSON to compare against after running")
+    run_parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    run_parser.add_argument("--min-time", type=float, default=0.5, help="seconds to sample each benchmark")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
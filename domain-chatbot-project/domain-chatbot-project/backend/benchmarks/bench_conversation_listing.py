@@ -0,0 +1,93 @@
+"""
+Conversation listing benchmark: SQL queries and wall time per request.
+
+Compares the old listing (load every conversation, lazy-load each domain
+while serializing) with the eager-loaded, cursor-paginated listing.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_conversation_listing --conversations 5000 --page-size 50
+"""
+import argparse
+
+from benchmarks.common import QueryCounter, configure_environment
+
+configure_environment()
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Conversation, Domain, User  # noqa: E402
+from app.schemas.conversation import Conversation as ConversationSchema  # noqa: E402
+from app.services.conversation_service import (  # noqa: E402
+    ConversationService,
+    encode_conversation_cursor,
+)
+
+DOMAIN_NAMES = ["stock", "law", "entertainment", "psychology", "technical"]
+
+def seed(conversation_count: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        domains = [Domain(name=name, system_prompt=f"You are a {name} expert.") for name in DOMAIN_NAMES]
+        user = User(email="bench@example.com", username="bench", password_hash="x")
+        db.add_all(domains + [user])
+        db.flush()
+        db.add_all([
+            Conversation(user_id=user.id, domain_id=domains[i % len(domains)].id, title=f"Conversation {i}")
+            for i in range(conversation_count)
+        ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+def legacy_listing(db, user_id):
+    """Previous behaviour: .all() then a lazy Domain load per distinct domain while serializing"""
+    conversations = (
+        db.query(Conversation)
+        .filter(Conversation.user_id == user_id)
+        .order_by(Conversation.updated_at.desc())
+        .all()
+    )
+    return [ConversationSchema.model_validate(c) for c in conversations]
+
+def paginated_listing(db, user_id, page_size, cursor=None, include_total=False):
+    conversations = ConversationService.get_user_conversations(db, user_id, limit=page_size, cursor=cursor)
+    body = [ConversationSchema.model_validate(c) for c in conversations]
+    if include_total:
+        ConversationService.count_user_conversations(db, user_id)
+    next_cursor = encode_conversation_cursor(conversations[-1]) if len(conversations) == page_size else None
+    return body, next_cursor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    user_id = seed(args.conversations)
+    counter = QueryCounter(engine)
+
+    def report(label, run):
+        # New session per request, like get_db
+        db = SessionLocal()
+        try:
+            with counter.measure() as result:
+                run(db)
+        finally:
+            db.close()
+        print(f"{label:<40} {result['queries']:>4} queries  {result['seconds'] * 1000:>8.1f} ms")
+
+    print(f"{args.conversations} conversations, page size {args.page_size}")
+    report("legacy: full list + lazy domains", lambda db: legacy_listing(db, user_id))
+    report("paginated: first page", lambda db: paginated_listing(db, user_id, args.page_size))
+    report("paginated: first page + total", lambda db: paginated_listing(db, user_id, args.page_size, include_total=True))
+
+    db = SessionLocal()
+    try:
+        _, cursor = paginated_listing(db, user_id, args.page_size)
+    finally:
+        db.close()
+    report("paginated: second page (cursor)", lambda db: paginated_listing(db, user_id, args.page_size, cursor=cursor))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Login throughput under concurrent load.
+
+Fires bursts of concurrent logins through auth_service.authenticate_user and,
+while they run, probes how long a sync route would wait for an anyio worker
+thread (what chat requests compete for). Compares the dedicated hashing pool
+with the old behaviour of verifying bcrypt on the shared anyio threadpool.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_login_throughput --users 20 --concurrency 50 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.common import configure_environment
+
+configure_environment()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50, help="logins in flight per burst")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    return parser.parse_args()
+
+ARGS = parse_args()
+os.environ["PASSWORD_HASH_ROUNDS"] = str(ARGS.rounds)
+
+import anyio  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, engine  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services import auth_service  # noqa: E402
+from app.utils.security import hash_password, verify_password  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+def seed(user_count: int):
+    Base.metadata.create_all(bind=engine)
+    password_hash = hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            User(email=f"user{i}@example.com", username=f"user{i}", password_hash=password_hash)
+            for i in range(user_count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+async def login_dedicated_pool(username: str):
+    async with AsyncSessionLocal() as db:
+        return await auth_service.authenticate_user(username, PASSWORD, db)
+
+async def login_shared_threadpool(username: str):
+    """Old path: sync route, so DB lookup and bcrypt both hold an anyio worker thread"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalars().first()
+    return await anyio.to_thread.run_sync(verify_password, PASSWORD, user.password_hash)
+
+async def probe_threadpool_wait(stop: asyncio.Event, samples: list):
+    """How long a sync route would wait for a free anyio worker thread"""
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await anyio.to_thread.run_sync(lambda: None)
+        samples.append(time.perf_counter() - started_at)
+        await asyncio.sleep(0.01)
+
+async def run_mode(label: str, login, args):
+    latencies, probe_samples = [], []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_threadpool_wait(stop, probe_samples))
+
+    async def timed_login(i: int):
+        started_at = time.perf_counter()
+        await login(f"user{i % args.users}")
+        latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    for _ in range(args.bursts):
+        await asyncio.gather(*(timed_login(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    await probe
+
+    total = args.bursts * args.concurrency
+    latencies.sort()
+    probe_samples.sort()
+    print(
+        f"{label:<24} {total / elapsed:>7.1f} logins/s  "
+        f"p50 {latencies[len(latencies) // 2] * 1000:>7.0f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:>7.0f} ms  "
+        f"threadpool wait p95 {probe_samples[int(len(probe_samples) * 0.95)] * 1000:>6.1f} ms "
+        f"(median {statistics.median(probe_samples) * 1000:.1f} ms)"
+    )
+
+async def main():
+    seed(ARGS.users)
+    print(f"bcrypt cost {ARGS.rounds}, {ARGS.concurrency} concurrent logins x {ARGS.bursts} bursts")
+    await run_mode("shared anyio threadpool", login_shared_threadpool, ARGS)
+    await run_mode("dedicated hashing pool", login_dedicated_pool, ARGS)
+
+if __name__ == "__main__":
+    asyncio.run(main())
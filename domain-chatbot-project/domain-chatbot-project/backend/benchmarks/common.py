@@ -0,0 +1,44 @@
+"""
+Shared setup for the offline benchmarks.
+
+Benchmarks run against a throwaway SQLite database, so the environment must be
+configured *before* anything under `app` is imported (app.config reads it at
+import time). app.database also builds the async engine, which uses `aiosqlite`
+for SQLite URLs.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+def configure_environment() -> str:
+    """Point the app at a fresh SQLite file and fill in required settings"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="chatbot-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("NEXT_PUBLIC_API_URL", "http://localhost:8000")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+    return db_path
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def measure(self):
+        """Yield a dict that holds the query count and elapsed seconds on exit"""
+        result = {}
+        start_count, started_at = self.count, time.perf_counter()
+        try:
+            yield result
+        finally:
+            result["queries"] = self.count - start_count
+            result["seconds"] = time.perf_counter() - started_at
@@ -0,0 +1,202 @@
+"""
+Offline micro-benchmarks for the chat hot path.
+
+Everything runs in-process against a throwaway SQLite database with a stubbed
+LLM, so results reflect our own code (prompt/context building, queries,
+serialization, LangGraph overhead) rather than network or model latency.
+"""
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+from benchmarks.common import configure_environment
+
+configure_environment()
+# Every iteration must exercise the pipeline, not the response cache
+os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+
+from langchain.schema import AIMessage  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Conversation, Domain, Message, User  # noqa: E402
+from app.schemas.conversation import ConversationWithMessages  # noqa: E402
+from app.services.message_service import MessageService  # noqa: E402
+
+# name -> setup function returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+class StubLLM:
+    """Stands in for ChatGoogleGenerativeAI; returns a canned reply instantly"""
+
+    def __init__(self, reply: str = "This is a stubbed model reply. " * 8):
+        self.reply = reply
+
+    def invoke(self, messages, **kwargs):
+        return AIMessage(content=self.reply)
+
+_fixture_cache = {}
+
+def _fixture():
+    """Seed one conversation with a long history (once per process)"""
+    if "conversation_id" in _fixture_cache:
+        return _fixture_cache
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        domain = Domain(name="technical", description="Technical", system_prompt="You are a senior engineer.")
+        user = User(email="bench@example.com", username="bench", password_hash="x")
+        db.add_all([domain, user])
+        db.flush()
+        conversation = Conversation(user_id=user.id, domain_id=domain.id, title="Benchmark conversation")
+        db.add(conversation)
+        db.flush()
+        started = datetime(2025, 1, 1)
+        db.add_all([
+            Message(
+                conversation_id=conversation.id,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"Message {i}: " + "lorem ipsum dolor sit amet " * (4 if i % 2 == 0 else 20),
+                created_at=started + timedelta(seconds=i),
+            )
+            for i in range(500)
+        ])
+        db.commit()
+        _fixture_cache["conversation_id"] = conversation.id
+        _fixture_cache["user_id"] = user.id
+    finally:
+        db.close()
+    return _fixture_cache
+
+def _sample_history(count: int = 10):
+    return [
+        Message(role="user" if i % 2 == 0 else "assistant", content="How do I profile a slow endpoint? " * (i % 5 + 1),
+                created_at=datetime(2025, 1, 1) + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+def _ai_service():
+    from app.services.ai_service import ai_service
+    return ai_service
+
+@benchmark("context_assembler.assemble")
+def bench_assemble_context():
+    from app.ai.context_assembler import context_assembler
+    history = _sample_history(20)
+    def run():
+        return context_assembler.assemble("technical", "medium", history, current_message=history[-1].content)
+    return run
+
+@benchmark("ai_service.detect_image_request")
+def bench_detect_image_request():
+    ai_service = _ai_service()
+    messages = [
+        "Can you explain how a B-tree index works?",
+        "draw a flowchart of the OAuth2 authorization code flow",
+        "What's the difference between TCP and UDP for game servers?",
+    ]
+    # The method logs every call; keep print out of the measurement
+    import builtins
+    def run():
+        original_print, builtins.print = builtins.print, lambda *a, **k: None
+        try:
+            for message in messages:
+                ai_service._detect_image_request(message)
+        finally:
+            builtins.print = original_print
+    return run
+
+@benchmark("message_service.history_last_10")
+def bench_history_last_10():
+    conversation_id = _fixture()["conversation_id"]
+    def run():
+        db = SessionLocal()
+        try:
+            return MessageService.get_conversation_history(db, conversation_id, limit=10)
+        finally:
+            db.close()
+    return run
+
+@benchmark("message_service.history_page_before_id")
+def bench_history_page():
+    conversation_id = _fixture()["conversation_id"]
+    db = SessionLocal()
+    try:
+        anchor_id = MessageService.get_conversation_history(db, conversation_id, limit=250)[0].id
+    finally:
+        db.close()
+    def run():
+        db = SessionLocal()
+        try:
+            return MessageService.get_conversation_history(db, conversation_id, limit=50, before_id=anchor_id)
+        finally:
+            db.close()
+    return run
+
+@benchmark("message_service.history_full_500")
+def bench_history_full():
+    conversation_id = _fixture()["conversation_id"]
+    def run():
+        db = SessionLocal()
+        try:
+            return MessageService.get_conversation_messages(db, conversation_id)
+        finally:
+            db.close()
+    return run
+
+@benchmark("schemas.conversation_with_messages_500")
+def bench_conversation_serialization():
+    fixture = _fixture()
+    db = SessionLocal()
+    try:
+        conversation = db.get(Conversation, fixture["conversation_id"])
+        conversation.domain  # load before the session closes
+        messages = MessageService.get_conversation_messages(db, conversation.id)
+        # Same construction as GET /conversations/{id}/messages
+        conversation_dict = {**conversation.__dict__, "messages": messages}
+    finally:
+        db.close()
+    return lambda: ConversationWithMessages(**conversation_dict).model_dump_json()
+
+def _router_benchmark(mode: str):
+    def setup():
+        from app.ai.domain_router import get_domain_router
+        domain_router = get_domain_router()
+        domain_router.llm = StubLLM()
+        def run():
+            return domain_router.generate_response(
+                domain="technical",
+                user_query="How do I profile a slow endpoint?",
+                context="Previous conversation: ...",
+                mode=mode,
+            )
+        return run
+    return setup
+
+for _mode in ("single_pass", "analyze_generate", "full"):
+    benchmark(f"domain_router.graph_{_mode}")(_router_benchmark(_mode))
+
+def run_benchmark(fn: Callable[[], object], min_time: float = 0.5, min_iterations: int = 20) -> dict:
+    """Time fn repeatedly (after a warmup) and summarise per-call latency"""
+    for _ in range(3):
+        fn()
+    samples = []
+    started_at = time.perf_counter()
+    while len(samples) < min_iterations or time.perf_counter() - started_at < min_time:
+        call_started_at = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_started_at)
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "p95_us": round(samples[int(len(samples) * 0.95)] * 1e6, 3),
+        "min_us": round(samples[0] * 1e6, 3),
+    }
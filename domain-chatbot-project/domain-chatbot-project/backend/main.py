@@ -1,11 +1,28 @@
-from fastapi import FastAPI, Depends
+import math
+import time
+_import_started_at = time.perf_counter()
+
+from fastapi import FastAPI, Depends, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.database import get_db, engine, Base
+from app.database import get_db, engine, Base, AsyncSessionLocal
 from app.models import User, Domain, Conversation, Message
 from app.config import settings
-from app.routers import auth, domains, conversations, chat
+from app.routers import auth, domains, conversations, chat, images
+from app.services.image_service import image_service
+from app.ai.response_cache import response_cache
+from app.services.message_writer import message_writer
+from app.services.title_worker import title_worker
+from app.services.domain_catalog import domain_catalog
+from app.services.ai_service import ai_service
+from app.utils.startup import startup_report
+from app.ai.admission import UpstreamOverloaded
+from app.utils.metrics import render_metrics
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.static_files import ImmutableStaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
 # Create FastAPI application instance
@@ -26,14 +43,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Profile-Output"],  # pagination, profiling
 )
 
+# Opt-in per-request profiling; not installed at all unless a token is configured
+if settings.profiling_token:
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=settings.profiling_token,
+        output_dir=settings.profiling_output_dir,
+        interval=settings.profiling_interval_seconds,
+    )
+
 # Ensure the static directory exists
 static_dir = os.path.join(os.getcwd(), "static")
 os.makedirs(static_dir, exist_ok=True)
 os.makedirs(os.path.join(static_dir, "generated_images"), exist_ok=True)
 
-# Mount the static directory
+# Mount the static directory; generated images are content-addressed, so they
+# get long-lived cache headers, and ones whose URL went out before they were
+# stored are generated on request (this mount must come before the /static one)
+app.mount(
+    "/static/generated_images",
+    ImmutableStaticFiles(
+        directory=os.path.join(static_dir, "generated_images"),
+        on_missing=image_service.restore_image,
+    ),
+    name="generated_images",
+)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Register routers
@@ -41,25 +78,61 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(domains.router, prefix="/api")
 app.include_router(conversations.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
+app.include_router(images.router, prefix="/api")
+
+@app.exception_handler(UpstreamOverloaded)
+async def upstream_overloaded_handler(request: Request, exc: UpstreamOverloaded):
+    """Shed requests quickly when an upstream AI provider is saturated"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
-# Create database tables (only if they don't exist)
-# In production, you'd use Alembic migrations instead
-Base.metadata.create_all(bind=engine)
+startup_report.record("imports", time.perf_counter() - _import_started_at)
 
 @app.on_event("startup")
 async def startup_event():
     """Code to run when the application starts"""
     print(f"Starting {settings.app_name}")
     print(f"Static directory: {static_dir}")
-    # Here you could add startup tasks like:
-    # - Database connection testing
-    # - Loading initial data
-    # - Setting up background tasks
+
+    if settings.auto_create_tables:
+        # Create database tables (only if they don't exist)
+        # In production, you'd use Alembic migrations instead
+        with startup_report.phase("create_tables"):
+            await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+
+    with startup_report.phase("message_writer"):
+        message_writer.start()
+
+    with startup_report.phase("title_worker"):
+        title_worker.start()
+
+    with startup_report.phase("domain_catalog"):
+        try:
+            async with AsyncSessionLocal() as db:
+                catalog = await domain_catalog.aload(db)
+            print(f"Loaded {len(catalog.domains)} domains into the catalog")
+        except Exception as e:
+            # Readers load it lazily on first use instead
+            print(f"Domain catalog preload failed: {e}")
+
+    if settings.ai_warmup_on_startup:
+        # Otherwise the AI stack is built lazily by the first chat request
+        with startup_report.phase("ai_warmup"):
+            for phase, seconds in (await asyncio.to_thread(ai_service.warmup)).items():
+                startup_report.record(f"ai_warmup.{phase}", seconds)
+
+    startup_report.print_report()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Code to run when the application shuts down"""
     print(f"Shutting down {settings.app_name}")
+    await message_writer.stop()
+    await title_worker.stop()
+    await image_service.close()
 
 # Root endpoint - basic health check
 @app.get("/")
@@ -113,4 +186,20 @@ async def test_database(db: Session = Depends(get_db)):
         return {
             "database_status": "error",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the AI response cache"""
+    return response_cache.stats()
+
+@app.get("/startup-report")
+async def get_startup_report():
+    """How long each startup phase took in this worker"""
+    return startup_report.as_dict()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -208,8 +208,10 @@ def test_ai_specifically():
         genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
         
         # Test if we can import LangChain components
-        from app.ai.domain_router import domain_router
-        from app.ai.chat_engine import chat_engine
+        from app.ai.domain_router import get_domain_router
+        from app.ai.chat_engine import get_chat_engine
+        get_domain_router()
+        get_chat_engine()
         
         print("✅ LangChain and Gemini components imported successfully")
         return True
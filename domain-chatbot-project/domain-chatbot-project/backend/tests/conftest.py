@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Settings are required at import time; unit tests don't touch the database or upstream APIs
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("NEXT_PUBLIC_API_URL", "http://localhost:3000")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+import os
+
+from app.services.image_store import ImageStore
+
+
+def _store(tmp_path, max_bytes=0):
+    return ImageStore(
+        directory=str(tmp_path / "images"),
+        state_directory=str(tmp_path / "state"),
+        max_bytes=max_bytes,
+    )
+
+
+def _save(store, prompt, content):
+    key = store.key_for(prompt, {})
+    store.save_meta(key, prompt, {})
+    temp_path = store.temp_path(key)
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    return key, store.commit(key, temp_path, len(content))
+
+
+def test_only_finished_images_are_public(tmp_path):
+    store = _store(tmp_path)
+    key, filename = _save(store, "a cat", b"png")
+
+    assert os.listdir(tmp_path / "images") == [filename]
+    assert store.get(key) == filename
+    assert store.get_meta(key) == {"prompt": "a cat", "params": {}}
+
+
+def test_eviction_removes_the_sidecar(tmp_path):
+    store = _store(tmp_path, max_bytes=200)
+    old_key, _ = _save(store, "old", b"x" * 100)
+    new_key, new_filename = _save(store, "new", b"x" * 100)
+
+    assert store.get(old_key) is None
+    assert store.get_meta(old_key) is None
+    assert store.get(new_key) == new_filename
+    assert os.listdir(tmp_path / "state") == [f"{new_key}.json"]
+
+
+def test_eviction_counts_other_workers_images(tmp_path):
+    worker_a = _store(tmp_path, max_bytes=250)
+    worker_b = _store(tmp_path, max_bytes=250)
+    worker_b.rescan_seconds = 0
+    worker_b.get(worker_b.key_for("anything", {}))  # index loaded before worker_a writes
+
+    theirs, filename = _save(worker_a, "theirs", b"x" * 100)
+    os.utime(tmp_path / "images" / filename, (1, 1))
+    ours, _ = _save(worker_b, "ours", b"x" * 100)
+
+    assert worker_a.get(theirs) is None
+    assert worker_b.get(ours) is not None
+
+
+def test_second_instance_sees_images_committed_by_the_first(tmp_path):
+    worker_a = _store(tmp_path)
+    worker_b = _store(tmp_path)
+    key = worker_b.key_for("a dog", {})
+    assert worker_b.get(key) is None  # index loaded before worker_a commits
+
+    _, filename = _save(worker_a, "a dog", b"png")
+
+    assert worker_b.get(key) == filename
+    assert worker_b.get_meta(key) == {"prompt": "a dog", "params": {}}
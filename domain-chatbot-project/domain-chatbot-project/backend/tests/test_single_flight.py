@@ -0,0 +1,53 @@
+import asyncio
+
+from app.ai.single_flight import StreamSingleFlight
+
+
+def test_followers_share_one_upstream_stream():
+    flights = StreamSingleFlight("test")
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def consume():
+        return [chunk async for chunk in flights.stream("key", upstream)]
+
+    async def main():
+        return await asyncio.gather(consume(), consume())
+
+    assert asyncio.run(main()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert calls == [1]
+
+
+def test_last_subscriber_leaving_closes_upstream():
+    flights = StreamSingleFlight("test")
+    started = None
+    closed = None
+
+    async def upstream():
+        try:
+            yield "first"
+            started.set()
+            await asyncio.Event().wait()  # never produces another chunk
+            yield "never"
+        finally:
+            closed.set()
+
+    async def consume():
+        async for _ in flights.stream("key", upstream):
+            pass
+
+    async def main():
+        nonlocal started, closed
+        started, closed = asyncio.Event(), asyncio.Event()
+        consumer = asyncio.create_task(consume())
+        await started.wait()
+        consumer.cancel()
+        await asyncio.wait_for(closed.wait(), timeout=1)
+        assert "key" not in flights._streams
+
+    asyncio.run(main())